@@ -0,0 +1,82 @@
+class AccountState:
+    """
+    Maintains the confirmed balance of every account seen on the chain.
+
+    Balances are updated by applying the deltas of each block as it is
+    connected to the chain, so lookups never have to replay history.
+    """
+    def __init__(self, initial_balance=150):
+        """
+        Initialize an empty account state.
+
+        Parameters:
+            initial_balance : int, optional
+                The balance every account starts with (default is 150).
+        """
+        self.initial_balance = initial_balance
+        self.balances = {}
+
+    def register(self, name):
+        """
+        Make sure an account exists, giving it the initial balance if it is new.
+
+        Parameters:
+            name : str
+                The account name to register.
+        """
+        if name not in self.balances:
+            self.balances[name] = self.initial_balance
+
+    def get_balance(self, name):
+        """
+        Get the confirmed balance of an account.
+
+        Parameters:
+            name : str
+                The account name to look up.
+
+        Returns:
+            int
+                The confirmed balance, or the initial balance for unknown accounts.
+        """
+        return self.balances.get(name, self.initial_balance)
+
+    def apply_block(self, block):
+        """
+        Apply the balance deltas of every transaction in a block.
+
+        Parameters:
+            block : Block
+                The block being connected to the chain.
+        """
+        for tx in block.transactions:
+            self.register(tx.sender)
+            self.register(tx.receiver)
+            self.balances[tx.sender] -= tx.amount
+            self.balances[tx.receiver] += tx.amount
+
+    def revert_block(self, block):
+        """
+        Undo the balance deltas of a block being disconnected from the chain.
+
+        Parameters:
+            block : Block
+                The block being disconnected; must be the most recently applied one.
+        """
+        for tx in reversed(block.transactions):
+            self.balances[tx.sender] += tx.amount
+            self.balances[tx.receiver] -= tx.amount
+
+    def restore(self, balances):
+        """
+        Reset the state to a saved set of balances, e.g. from a snapshot.
+
+        Accounts missing from the saved balances go back to the initial balance.
+
+        Parameters:
+            balances : dict
+                The balances to restore.
+        """
+        for name in self.balances:
+            self.balances[name] = self.initial_balance
+        self.balances.update(balances)
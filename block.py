@@ -1,11 +1,62 @@
 import hashlib
 import json
 import time
+from concurrent.futures import ProcessPoolExecutor
 from transaction import Transaction
+from account_state import AccountState
+from history import HistoryIndex
+from mempool import Mempool
+from miner import Miner
+from merkle import merkle_root as compute_merkle_root, merkle_proof, EMPTY_ROOT
+
+
+def header_prefix(index, previous_hash, timestamp, merkle_root):
+    """
+    Canonically encode the block header fields that precede the proof of work.
+
+    Parameters:
+        index : int
+            The position of the block in the blockchain.
+        previous_hash : str
+            The hash of the previous block in the chain.
+        timestamp : float
+            The time when the block was created.
+        merkle_root : str
+            The Merkle root of the block's transaction ids.
+
+    Returns:
+        bytes
+            The encoded header prefix.
+    """
+    header_data = {
+        "index": index,
+        "previous_hash": previous_hash,
+        "timestamp": timestamp,
+        "merkle_root": merkle_root,
+    }
+    return json.dumps(header_data, sort_keys=True).encode()
+
+
+def hash_header(header):
+    """
+    Compute a block hash from its header alone, without the transaction bodies.
+
+    Parameters:
+        header : dict
+            A header as returned by Block.header().
+
+    Returns:
+        str
+            The hexadecimal block hash.
+    """
+    prefix = header_prefix(header["index"], header["previous_hash"],
+                           header["timestamp"], header["merkle_root"])
+    return hashlib.sha256(prefix + str(header["proof_of_work"]).encode()).hexdigest()
 
 
 class Block:
-    def __init__(self, index, previous_hash, timestamp, transactions, proof_of_work):
+    def __init__(self, index, previous_hash, timestamp, transactions, proof_of_work,
+                 merkle_root=None, block_hash=None):
         """
         Initialize a new Block in the blockchain.
 
@@ -20,68 +71,452 @@ class Block:
                 List of transactions included in this block.
             proof_of_work : int
                 The proof of work number that satisfies the difficulty requirement.
+            merkle_root : str, optional
+                A trusted Merkle root; computed from the transactions if omitted.
+            block_hash : str, optional
+                A trusted block hash, e.g. for blocks loaded from local storage;
+                computed from the header if omitted.
+
+        Raises:
+            ValueError
+                If the Merkle root is computed and a transaction appears twice.
+                The tree pairs an odd last node with itself, so [a, b, c] and
+                [a, b, c, c] share a root; rejecting duplicates keeps the root
+                a unique commitment.
         """
         self.index = index
         self.previous_hash = previous_hash
         self.timestamp = timestamp
         self.transactions = transactions
         self.proof_of_work = proof_of_work
-        self.hash = self.compute_hash()
+        if merkle_root is None:
+            txids = [tx.txid for tx in transactions]
+            if len(set(txids)) != len(txids):
+                raise ValueError("block contains duplicate transactions")
+            merkle_root = compute_merkle_root(txids)
+        self.merkle_root = merkle_root
+        self.hash = block_hash or self.compute_hash()
+
+    def hash_prefix(self):
+        """
+        Serialize every hashed header field except the proof of work.
+
+        Transactions are committed to through the Merkle root, so the
+        prefix has a fixed size no matter how many transactions the block
+        holds. The block hash is SHA-256 over this prefix followed by the
+        proof of work, so miners can hash the prefix once and vary only the nonce.
+
+        Returns:
+            bytes
+                The canonical encoding of the block header without the nonce.
+        """
+        return header_prefix(self.index, self.previous_hash, self.timestamp, self.merkle_root)
 
     def compute_hash(self):
         """
-        Compute the SHA-256 hash of the block's contents.
+        Compute the SHA-256 hash of the block header.
 
         Returns:
             str
                 The hexadecimal string representation of the block's hash.
         """
-        block_data = {
+        block_bytes = self.hash_prefix() + str(self.proof_of_work).encode()
+        return hashlib.sha256(block_bytes).hexdigest()
+
+    def get_merkle_proof(self, txid):
+        """
+        Build a Merkle inclusion proof for one of the block's transactions.
+
+        Parameters:
+            txid : str
+                The id of the transaction to prove.
+
+        Returns:
+            list[list] or None
+                The proof (see merkle.merkle_proof), or None if the transaction
+                is not in this block.
+        """
+        txids = [tx.txid for tx in self.transactions]
+        if txid not in txids:
+            return None
+        return merkle_proof(txids, txids.index(txid))
+
+    def header(self):
+        """
+        Get the block's header fields, without the transaction bodies.
+
+        Returns:
+            dict
+                The index, previous hash, timestamp, proof of work, Merkle root and hash of the block.
+        """
+        return {
             "index": self.index,
             "previous_hash": self.previous_hash,
             "timestamp": self.timestamp,
-            "transactions": [str(tx) for tx in self.transactions],
             "proof_of_work": self.proof_of_work,
+            "merkle_root": self.merkle_root,
+            "hash": self.hash,
         }
-        block_string = json.dumps(block_data, sort_keys=True)
-        return hashlib.sha256(block_string.encode()).hexdigest()
+
+    def to_dict(self):
+        """
+        Serialize the full block, including its transactions, to a dictionary.
+
+        Returns:
+            dict
+                The block header fields plus the list of transaction dictionaries.
+        """
+        block_data = self.header()
+        block_data["transactions"] = [tx.to_dict() for tx in self.transactions]
+        return block_data
+
+
+def block_digest(data):
+    """
+    Recompute a block's Merkle root and hash from its dict form.
+
+    Module-level so it can be sent to worker processes.
+
+    Parameters:
+        data : dict
+            The block, as produced by Block.to_dict().
+
+    Returns:
+        tuple
+            (merkle_root, block_hash) computed from the block's contents, or
+            (None, None) if the block is malformed, e.g. is missing a field or
+            repeats a transaction.
+    """
+    try:
+        txs = [Transaction(**tx) for tx in data["transactions"]]
+        block = Block(data["index"], data["previous_hash"], data["timestamp"], txs,
+                      data["proof_of_work"])
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return None, None
+    return block.merkle_root, block.hash
+
+
+def block_digests(chain_data):
+    """
+    Recompute the Merkle roots and hashes of a run of blocks.
+
+    Parameters:
+        chain_data : list[dict]
+            The blocks, as produced by Block.to_dict().
+
+    Returns:
+        list[tuple]
+            block_digest() of each block, in order.
+    """
+    return [block_digest(data) for data in chain_data]
+
+
+def find_hash_mismatch(chain_data, pool=None, chunksize=500):
+    """
+    Check every block's recorded Merkle root and hash against its contents.
+
+    Parameters:
+        chain_data : list[dict]
+            The blocks to check, as produced by Block.to_dict().
+        pool : concurrent.futures.ProcessPoolExecutor, optional
+            Worker processes to spread the hashing over; the caller owns
+            the pool and keeps it running (default is None, which hashes
+            in this process).
+        chunksize : int, optional
+            How many blocks each worker task hashes (default is 500).
+
+    Returns:
+        int or None
+            The position in chain_data of the first block whose contents do
+            not match its recorded Merkle root or hash, or None if all match.
+    """
+    chunks = []
+    if pool is not None and len(chain_data) > chunksize:
+        chunks = [pool.submit(block_digests, chain_data[start:start + chunksize])
+                  for start in range(0, len(chain_data), chunksize)]
+        digests = (digest for chunk in chunks for digest in chunk.result())
+    else:
+        digests = map(block_digest, chain_data)
+    try:
+        for i, (root, block_hash) in enumerate(digests):
+            if root != chain_data[i].get("merkle_root") or block_hash != chain_data[i]["hash"]:
+                return i
+        return None
+    finally:
+        # stop hashing the rest of the chain once a mismatch is found
+        for chunk in chunks:
+            chunk.cancel()
 
 
 class Blockchain:
-    def __init__(self, difficulty=2):
+    def __init__(self, difficulty=2, initial_balance=150, mining_workers=1, store=None,
+                 snapshots=None):
         """
         Initialize a new Blockchain.
 
         Parameters:
             difficulty : int, optional
                 The number of leading zeros required for a valid block hash (default is 2).
+            initial_balance : int, optional
+                The balance every account starts with (default is 150).
+            mining_workers : int, optional
+                The number of processes used to search for a proof of work (default is 1).
+            store : BlockStore, optional
+                On-disk block log to persist the chain to and reload it from.
+            snapshots : SnapshotStore, optional
+                Where to write periodic account-state snapshots and restore them from.
         """
-        self.chain = []
-        self.current_transactions = []
+        self.chain = []  # height -> Block
+        self.block_index = {}  # { block hash: height }
+        # txids of every transaction in the chain's full blocks, so a
+        # confirmed transaction cannot re-enter the mempool
+        self.confirmed_txids = set()
+        self.mempool = Mempool(self.confirmed_txids)
         self.difficulty = difficulty
+        self.state = AccountState(initial_balance)
+        self.history = HistoryIndex()
+        self.miner = Miner(difficulty, mining_workers)
+        self.store = store
+        self.snapshots = snapshots
+        # blocks at or below this height were bootstrapped from a snapshot
+        # and only have their headers
+        self.pruned_height = 0
+        # blocks at or below this height already passed is_valid_chain
+        self.verified_height = 0
         self.create_genesis_block()
+        if store is not None:
+            self.load_from_store()
 
     def create_genesis_block(self):
         """
         Create the first block (genesis block) in the blockchain with default values.
+
+        The genesis block uses a fixed timestamp so every peer shares the same
+        root and chains from different peers can be compared by fork point.
+        Its fields have the same types as any other block's, so it survives
+        the binary wire encoding unchanged.
         """
         # Create the first block (genesis block)
-        genesis_block = Block(0, "0", time.time(), [], "0")
+        genesis_block = Block(0, "0" * 64, 0.0, [], 0)
         self.chain.append(genesis_block)
+        self.block_index[genesis_block.hash] = 0
+
+    def load_from_store(self):
+        """
+        Reload the chain from the block store.
+
+        Stored blocks were validated before they were written, so they are
+        loaded with their recorded hashes instead of being re-verified.
+        The account state is restored from the latest snapshot and only the
+        blocks above it are replayed. A store that does not start with our
+        genesis block is reset.
+        """
+        if len(self.store) and self.store.read(0)["hash"] != self.chain[0].hash:
+            self.store.truncate(0)
+        if not len(self.store):
+            self.store.append(self.chain[0])
+            return
+        for height in range(1, len(self.store)):
+            block = self.create_block_from_dict(self.store.read(height), trusted=True)
+            self.block_index[block.hash] = height
+            self.chain.append(block)
+            self.history.apply_block(block)
+            self.confirmed_txids.update(tx.txid for tx in block.transactions)
+            if not block.transactions and block.merkle_root != EMPTY_ROOT:
+                self.pruned_height = height
+        self.rebuild_state(len(self.chain) - 1)
+
+    def rebuild_state(self, height):
+        """
+        Rebuild the account state for the current chain, starting from the
+        latest snapshot at or below a height and replaying the blocks above it.
+
+        Parameters:
+            height : int
+                The highest height whose snapshot may be used, e.g. a fork point.
+        """
+        snapshot = self.snapshots.latest(height) if self.snapshots else None
+        if (snapshot and snapshot["height"] < len(self.chain)
+                and self.chain[snapshot["height"]].hash == snapshot["hash"]):
+            self.state.restore(snapshot["balances"])
+            start = snapshot["height"] + 1
+        else:
+            self.state.restore({})
+            start = 0
+        for block in self.chain[start:]:
+            self.state.apply_block(block)
+            self.take_snapshot_if_due(block)
+
+    def take_snapshot_if_due(self, block):
+        """
+        Write an account-state snapshot if the block falls on the snapshot interval.
+
+        Parameters:
+            block : Block
+                The block just applied to the account state.
+        """
+        if self.snapshots is not None and self.snapshots.is_due(block.index):
+            self.snapshots.save(block.index, block.hash, dict(self.state.balances))
+
+    def load_snapshot(self, headers, snapshot):
+        """
+        Bootstrap from a peer's snapshot instead of downloading the full history.
+
+        The chain below the snapshot is filled with header-only blocks, and
+        the account state is taken from the snapshot. Blocks above it are
+        then fetched normally.
+
+        Parameters:
+            headers : list[dict]
+                Validated headers from genesis up to the snapshot height.
+            snapshot : dict
+                The snapshot ({"height", "hash", "balances"}); its hash must
+                match the last header.
+        """
+        blocks = [
+            Block(h["index"], h["previous_hash"], h["timestamp"], [], h["proof_of_work"],
+                  merkle_root=h["merkle_root"], block_hash=h["hash"])
+            for h in headers[1:]
+        ]
+        self.chain = self.chain[:1] + blocks
+        self.block_index = {block.hash: height for height, block in enumerate(self.chain)}
+        self.pruned_height = snapshot["height"]
+        self.verified_height = 0
+        self.state.restore(snapshot["balances"])
+        self.history.clear()
+        self.confirmed_txids.clear()
+        if self.store is not None:
+            self.store.truncate(1)
+            for block in blocks:
+                self.store.append(block)
+        if self.snapshots is not None:
+            self.snapshots.discard_above(-1)
+            self.snapshots.save(snapshot["height"], snapshot["hash"], snapshot["balances"])
 
     def add_block(self, block):
         """
-        Add a new block to the blockchain.
+        Add a new block to the blockchain, apply its balance deltas, index
+        its transactions and drop them from the mempool.
 
         Parameters:
             block : Block
                 The block to be added to the chain.
         """
+        self.block_index[block.hash] = len(self.chain)
         self.chain.append(block)
+        self.state.apply_block(block)
+        self.history.apply_block(block)
+        self.confirmed_txids.update(tx.txid for tx in block.transactions)
+        self.mempool.remove_confirmed(block)
+        if self.store is not None:
+            self.store.append(block)
+        self.take_snapshot_if_due(block)
+
+    def reorganize(self, fork_height, new_blocks):
+        """
+        Switch to another branch that shares our chain up to a fork point.
+
+        Blocks above the fork point are disconnected tip-first, undoing
+        their balance deltas, and the new branch's blocks are then connected
+        on top. Transactions from the disconnected blocks that the new
+        branch did not confirm and that are still affordable go back to the
+        mempool. The cost is proportional to the reorg depth, not the chain length.
+
+        Parameters:
+            fork_height : int
+                The height of the last block both branches share.
+            new_blocks : list[Block]
+                The new branch's blocks above the fork point, in order.
+
+        Returns:
+            list[Transaction]
+                Transactions from disconnected blocks that were returned to the mempool.
+        """
+        if fork_height < self.pruned_height:
+            raise ValueError("cannot reorganize below the snapshot we bootstrapped from")
+        disconnected = self.chain[fork_height + 1:]
+        for block in reversed(disconnected):
+            self.state.revert_block(block)
+            self.history.revert_block(block)
+            self.confirmed_txids.difference_update(tx.txid for tx in block.transactions)
+            del self.block_index[block.hash]
+        del self.chain[fork_height + 1:]
+        self.verified_height = min(self.verified_height, fork_height)
+        if self.store is not None:
+            self.store.truncate(fork_height + 1)
+        if self.snapshots is not None:
+            self.snapshots.discard_above(fork_height)
+
+        for block in new_blocks:
+            self.add_block(block)
+
+        readmitted = []
+        for block in disconnected:
+            for tx in block.transactions:
+                if tx.txid in self.confirmed_txids or tx in self.mempool:
+                    continue
+                available = self.state.get_balance(tx.sender) - self.mempool.pending_debit(tx.sender)
+                if available >= tx.amount and self.mempool.add(tx):
+                    readmitted.append(tx)
+        return readmitted
+
+    def has_block(self, block_hash):
+        """
+        Check whether a block is part of the chain.
+
+        Parameters:
+            block_hash : str
+                The hash of the block to look up.
+
+        Returns:
+            bool
+                True if the block is in the chain, False otherwise.
+        """
+        return block_hash in self.block_index
+
+    def get_block(self, block_hash):
+        """
+        Look up a block in the chain by its hash.
+
+        Parameters:
+            block_hash : str
+                The hash of the block to look up.
+
+        Returns:
+            Block or None
+                The block, or None if it is not in the chain.
+        """
+        height = self.block_index.get(block_hash)
+        if height is None:
+            return None
+        return self.chain[height]
+
+    def get_locator(self):
+        """
+        Build a block locator: a sparse list of our block hashes from the tip
+        back to genesis, dense near the tip and exponentially spaced further back.
+
+        A peer can find the most recent block we share with it from the
+        locator alone, without either side sending its whole chain.
+
+        Returns:
+            list[str]
+                Block hashes ordered from the tip down to the genesis block.
+        """
+        locator = []
+        height = len(self.chain) - 1
+        step = 1
+        while height > 0:
+            locator.append(self.chain[height].hash)
+            if len(locator) >= 10:
+                step *= 2
+            height -= step
+        locator.append(self.chain[0].hash)
+        return locator
 
     def mine(self):
         """
-        Mine a new block containing current transactions by finding a valid proof of work.
+        Mine a new block containing the mempool's transactions by finding a valid proof of work.
 
         Returns:
             Block
@@ -92,13 +527,10 @@ class Blockchain:
         previous_hash = last_block.hash
         timestamp = time.time()
         #proof_of_work = self.proof_of_work(index, previous_hash, timestamp)
-        proof_of_work = 0
-        block = Block(index, previous_hash, timestamp, self.current_transactions, proof_of_work)
-        while block.hash[:self.difficulty] != "0" * self.difficulty:
-            proof_of_work += 1
-            block = Block(index, previous_hash, timestamp, self.current_transactions, proof_of_work)
+        transactions = list(self.mempool)
+        block = Block(index, previous_hash, timestamp, transactions, 0)
+        block.proof_of_work, block.hash = self.miner.mine(block.hash_prefix())
         self.add_block(block)
-        self.current_transactions = []
         return block
 
     def proof_of_work(self, index, previous_hash, timestamp):
@@ -129,28 +561,45 @@ class Blockchain:
         """
         Validate the integrity of the blockchain.
 
+        The block hash covers only the header, so each block's transactions
+        are rehashed and checked against its Merkle root as well, except
+        for header-only blocks at or below pruned_height. Blocks that passed
+        an earlier call are not checked again; only blocks connected since
+        then are.
+
         Returns:
             bool
-                True if the chain is valid (proper links and valid hashes), False otherwise.
+                True if the chain is valid (proper links, valid hashes and
+                Merkle roots), False otherwise.
         """
-        for i in range(1, len(self.chain)):
+        for i in range(self.verified_height + 1, len(self.chain)):
             previous_block = self.chain[i - 1]
             current_block = self.chain[i]
             if current_block.previous_hash != previous_block.hash:
                 return False
             if current_block.hash != current_block.compute_hash():
                 return False
+            if i > self.pruned_height:
+                txids = [tx.compute_txid() for tx in current_block.transactions]
+                if len(set(txids)) != len(txids):
+                    return False
+                if compute_merkle_root(txids) != current_block.merkle_root:
+                    return False
             if not current_block.hash.startswith('0' * self.difficulty):
                 return False
+        self.verified_height = len(self.chain) - 1
         return True
     
-    def create_block_from_dict(self, data):
+    def create_block_from_dict(self, data, trusted=False):
         """
         Create a Block instance from a dictionary of block data.
 
         Parameters:
             data : dict
                 Dictionary containing block data (index, previous_hash, timestamp, transactions, proof_of_work).
+            trusted : bool, optional
+                Reuse the recorded Merkle root and hash instead of recomputing
+                them (default is False). Only for data we validated ourselves.
 
         Returns:
             Block
@@ -162,7 +611,9 @@ class Blockchain:
             previous_hash=data['previous_hash'],
             timestamp=data['timestamp'],
             transactions=txs,
-            proof_of_work=data['proof_of_work']
+            proof_of_work=data['proof_of_work'],
+            merkle_root=data.get('merkle_root') if trusted else None,
+            block_hash=data.get('hash') if trusted else None
         )
 
 
@@ -175,3 +626,49 @@ class Blockchain:
                 The last block in the chain.
         """
         return self.chain[-1]
+
+
+if __name__ == "__main__":
+    # compare validating a downloaded 100k-block chain the old way (rebuild
+    # each block to check its hash, then build it again to connect it) with
+    # find_hash_mismatch followed by trusted construction
+    import os
+    import random
+
+    blocks = [Block(0, "0" * 64, 0.0, [], 0)]
+    for height in range(1, 100000):
+        txs = [Transaction(f"peer-{i}", f"peer-{i + 1}", i + 1) for i in range(random.randint(0, 3))]
+        blocks.append(Block(height, blocks[-1].hash, time.time(), txs, height))
+    chain_data = [block.to_dict() for block in blocks]
+    # proof of work is not what is being measured, so any hash passes
+    blockchain = Blockchain(difficulty=0)
+
+    def measure(label, func):
+        started = time.perf_counter()
+        result = func()
+        print(f"{label:<68} {time.perf_counter() - started:6.2f} s  {result}")
+
+    def rebuild_twice():
+        valid = all(blockchain.create_block_from_dict(data).hash == data["hash"]
+                    for data in chain_data[1:])
+        built = [blockchain.create_block_from_dict(data) for data in chain_data[1:]]
+        return valid and len(built)
+
+    def check_then_trust(pool=None):
+        valid = find_hash_mismatch(chain_data[1:], pool) is None
+        built = [blockchain.create_block_from_dict(data, trusted=True) for data in chain_data[1:]]
+        return valid and len(built)
+
+    measure("sync: rebuild each block twice", rebuild_twice)
+    measure("sync: find_hash_mismatch + trusted build (in process)", check_then_trust)
+    # the pool is started before timing, as a peer starts it once at startup
+    workers = max(os.cpu_count() or 1, 2)
+    pool = ProcessPoolExecutor(max_workers=workers)
+    list(pool.map(abs, range(workers)))
+    measure(f"sync: find_hash_mismatch + trusted build ({workers}-process pool, "
+            f"{os.cpu_count()} cores)", lambda: check_then_trust(pool))
+    pool.shutdown()
+
+    blockchain.chain = blocks
+    measure("Blockchain.is_valid_chain()", blockchain.is_valid_chain)
+    measure("Blockchain.is_valid_chain() again", blockchain.is_valid_chain)
@@ -0,0 +1,126 @@
+import queue
+import threading
+
+
+class BlockPipeline:
+    """
+    Validates and connects incoming blocks in stages.
+
+    Each stage (decode, proof of work check, link to tip, apply) runs on
+    its own worker thread and hands blocks to the next stage through a
+    queue, so a block being hashed or applied never holds up the server
+    accepting connections, and consecutive blocks overlap in the pipeline.
+    A stage rejects a block by raising ValueError; the block is logged
+    and dropped. Only the apply stage modifies the blockchain.
+    """
+    def __init__(self, blockchain, queue_size=100):
+        """
+        Start the pipeline's stage workers.
+
+        Parameters:
+            blockchain : Blockchain
+                The blockchain that accepted blocks are connected to.
+            queue_size : int, optional
+                The maximum number of blocks waiting in front of each stage
+                (default is 100).
+        """
+        self.blockchain = blockchain
+        self.incoming = queue.Queue(maxsize=queue_size)
+        self.decoded = queue.Queue(maxsize=queue_size)
+        self.verified = queue.Queue(maxsize=queue_size)
+        self.linked = queue.Queue(maxsize=queue_size)
+        # (hash, index) of the last block handed to the apply stage
+        self.last_linked = None
+        stages = [
+            ("decode", self.incoming, self._decode, self.decoded),
+            ("proof of work", self.decoded, self._check_proof_of_work, self.verified),
+            ("link", self.verified, self._link, self.linked),
+            ("apply", self.linked, self._apply, None),
+        ]
+        for name, source, stage, sink in stages:
+            threading.Thread(target=self._run_stage, args=(name, source, stage, sink), daemon=True).start()
+
+    def submit(self, block_data):
+        """
+        Queue a received block for validation without blocking.
+
+        Parameters:
+            block_data : dict
+                The block, as produced by Block.to_dict().
+
+        Returns:
+            bool
+                True if the block was queued, False if the pipeline is full
+                and the block was dropped.
+        """
+        try:
+            self.incoming.put_nowait(block_data)
+            return True
+        except queue.Full:
+            print(f"⚠️ Block pipeline full, dropping block {block_data.get('hash', '?')[:10]}")
+            return False
+
+    def _run_stage(self, name, source, stage, sink):
+        """
+        Worker loop: pass each block through one stage and on to the next queue.
+        """
+        while True:
+            item = source.get()
+            try:
+                result = stage(item)
+            except Exception as e:
+                # malformed data can fail in many ways; drop the block,
+                # never the worker
+                print(f"❌ Block rejected at {name}: {e!r}")
+                result = None
+            finally:
+                source.task_done()
+            if result is not None and sink is not None:
+                sink.put(result)
+
+    def _decode(self, block_data):
+        """
+        Build a Block from its dict and check the announced hash.
+
+        Returns None for blocks we already have.
+        """
+        if self.blockchain.has_block(block_data["hash"]):
+            return None
+        block = self.blockchain.create_block_from_dict(block_data)
+        # the recomputed hash must match the announced one
+        if block.hash != block_data["hash"]:
+            raise ValueError("block hash mismatch")
+        return block
+
+    def _check_proof_of_work(self, block):
+        """
+        Check the block hash meets the chain's difficulty.
+        """
+        if not block.hash.startswith('0' * self.blockchain.difficulty):
+            raise ValueError(f"invalid proof of work for block {block.index}")
+        return block
+
+    def _link(self, block):
+        """
+        Check the block extends our tip, or the block just ahead of it in the pipeline.
+        """
+        tip = self.blockchain.get_last_block()
+        parents = {tip.hash: tip.index}
+        if self.last_linked is not None:
+            parents[self.last_linked[0]] = self.last_linked[1]
+        if block.previous_hash not in parents:
+            raise ValueError(f"block {block.index} does not extend our tip")
+        if block.index != parents[block.previous_hash] + 1:
+            raise ValueError(f"block {block.index} has the wrong height")
+        self.last_linked = (block.hash, block.index)
+        return block
+
+    def _apply(self, block):
+        """
+        Connect the block, re-checking the tip in case it moved since linking.
+        """
+        if block.previous_hash != self.blockchain.get_last_block().hash:
+            raise ValueError(f"tip moved before block {block.index} was applied")
+        self.blockchain.add_block(block)
+        print(f"✅ Added block {block.index} ({block.hash[:10]}...)")
+        return block
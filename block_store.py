@@ -0,0 +1,122 @@
+import json
+import mmap
+import os
+import struct
+import threading
+
+# each index entry is the (offset, length) of one block record in the log
+INDEX_ENTRY = struct.Struct(">QI")
+
+
+class BlockStore:
+    """
+    Append-only on-disk block log with a fixed-width offset index.
+
+    Blocks are appended to `blocks.dat` as JSON records and located through
+    `blocks.idx`, which holds one (offset, length) entry per height. Reads
+    go through a memory map of the log, so loading a block is a slice
+    rather than a file seek.
+    """
+    def __init__(self, directory):
+        """
+        Open (or create) a block store in a directory.
+
+        Any record left half-written by a crash is discarded.
+
+        Parameters:
+            directory : str
+                The directory holding the log and index files.
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.log_path = os.path.join(directory, "blocks.dat")
+        self.index_path = os.path.join(directory, "blocks.idx")
+        self.lock = threading.Lock()
+        self._map = None
+        for path in (self.log_path, self.index_path):
+            if not os.path.exists(path):
+                open(path, "wb").close()
+        self.log = open(self.log_path, "r+b")
+        self.index = open(self.index_path, "r+b")
+        self._recover()
+
+    def _recover(self):
+        """
+        Drop a partial trailing index entry and any log bytes past the last
+        indexed record.
+        """
+        log_size = os.path.getsize(self.log_path)
+        self.count = os.path.getsize(self.index_path) // INDEX_ENTRY.size
+        # keep only entries whose record made it to the log in full
+        while self.count and sum(self._entry(self.count - 1)) > log_size:
+            self.count -= 1
+        log_end = sum(self._entry(self.count - 1)) if self.count else 0
+        self.index.truncate(self.count * INDEX_ENTRY.size)
+        self.log.truncate(log_end)
+
+    def _entry(self, height):
+        """
+        Read the (offset, length) index entry for a height.
+        """
+        self.index.seek(height * INDEX_ENTRY.size)
+        return INDEX_ENTRY.unpack(self.index.read(INDEX_ENTRY.size))
+
+    def __len__(self):
+        return self.count
+
+    def append(self, block):
+        """
+        Append a block to the end of the log.
+
+        Parameters:
+            block : Block
+                The block to store; its height must equal the store's length.
+        """
+        record = json.dumps(block.to_dict()).encode()
+        with self.lock:
+            self.log.seek(0, os.SEEK_END)
+            offset = self.log.tell()
+            self.log.write(record)
+            self.log.flush()
+            self.index.seek(self.count * INDEX_ENTRY.size)
+            self.index.write(INDEX_ENTRY.pack(offset, len(record)))
+            self.index.flush()
+            self.count += 1
+
+    def read(self, height):
+        """
+        Read the block stored at a height.
+
+        Parameters:
+            height : int
+                The height of the block to read.
+
+        Returns:
+            dict
+                The block data, as produced by Block.to_dict().
+        """
+        with self.lock:
+            offset, length = self._entry(height)
+            if self._map is None or len(self._map) < offset + length:
+                if self._map is not None:
+                    self._map.close()
+                self._map = mmap.mmap(self.log.fileno(), 0, access=mmap.ACCESS_READ)
+            return json.loads(self._map[offset:offset + length])
+
+    def truncate(self, height):
+        """
+        Drop every block at or above a height, e.g. before writing a new branch.
+
+        Parameters:
+            height : int
+                The number of blocks to keep.
+        """
+        with self.lock:
+            if height >= self.count:
+                return
+            offset = self._entry(height)[0]
+            if self._map is not None:
+                self._map.close()
+                self._map = None
+            self.count = height
+            self.index.truncate(height * INDEX_ENTRY.size)
+            self.log.truncate(offset)
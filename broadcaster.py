@@ -0,0 +1,184 @@
+import queue
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class Broadcaster:
+    """
+    Long-lived fan-out for messages sent to peers.
+
+    Sends go through a bounded job queue drained by a fixed pool of worker
+    threads, and each peer gets its own keep-alive HTTP session, so heavy
+    submission load reuses connections and threads instead of opening new
+    ones per message. When the queue is full, callers block for a short
+    while (backpressure) and the message is dropped if no room frees up.
+    """
+    def __init__(self, workers=8, queue_size=1000, timeout=3, enqueue_timeout=1):
+        """
+        Start the broadcaster's worker threads.
+
+        Parameters:
+            workers : int, optional
+                The number of worker threads sending messages (default is 8).
+            queue_size : int, optional
+                The maximum number of queued sends (default is 1000).
+            timeout : float, optional
+                The per-request timeout in seconds (default is 3).
+            enqueue_timeout : float, optional
+                How long a caller waits for queue space before the send is
+                dropped (default is 1).
+        """
+        self.workers = workers
+        self.timeout = timeout
+        self.enqueue_timeout = enqueue_timeout
+        self.jobs = queue.Queue(maxsize=queue_size)
+        self.sessions = {}  # { (host, port): requests.Session }
+        self.sessions_lock = threading.Lock()
+        for _ in range(workers):
+            threading.Thread(target=self._run, daemon=True).start()
+
+    def session(self, peer):
+        """
+        Get the keep-alive session for a peer, creating it on first use.
+
+        Parameters:
+            peer : tuple
+                (host, port) of the peer.
+
+        Returns:
+            requests.Session
+                A session whose connection pool is reused for every request to the peer.
+        """
+        with self.sessions_lock:
+            session = self.sessions.get(peer)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.workers)
+                session.mount("http://", adapter)
+                self.sessions[peer] = session
+            return session
+
+    def post(self, peer, path, payload):
+        """
+        Synchronously POST a JSON payload to a peer over its pooled session.
+
+        Parameters:
+            peer : tuple
+                (host, port) of the peer.
+            path : str
+                The endpoint path, e.g. "/receive_block".
+            payload : dict
+                The JSON body to send.
+
+        Returns:
+            requests.Response
+                The peer's response.
+        """
+        url = f"http://{peer[0]}:{peer[1]}{path}"
+        return self.session(peer).post(url, json=payload, timeout=self.timeout)
+
+    def submit(self, func, *args):
+        """
+        Queue a job for the worker pool, blocking briefly if the queue is full.
+
+        Parameters:
+            func : callable
+                The function to run on a worker thread.
+            *args
+                Arguments for the function.
+
+        Returns:
+            bool
+                True if the job was queued, False if it was dropped.
+        """
+        try:
+            self.jobs.put((func, args), timeout=self.enqueue_timeout)
+            return True
+        except queue.Full:
+            print(f"⚠️ Broadcast queue full, dropping {func.__name__}{args[:2]}")
+            return False
+
+    def _run(self):
+        """
+        Worker loop: run queued jobs forever, logging failures.
+        """
+        while True:
+            func, args = self.jobs.get()
+            try:
+                func(*args)
+            except Exception as e:
+                print(f"❌ Broadcast to {args[0] if args else '?'} failed: {e}")
+            finally:
+                self.jobs.task_done()
+
+
+class TransactionBatcher:
+    """
+    Coalesces outgoing transactions into batches.
+
+    Transactions are collected for up to `window` seconds, or until
+    `max_batch` of them are waiting, and then handed to `flush` together,
+    so a burst of submissions costs a few requests per peer instead of
+    one per transaction.
+    """
+    def __init__(self, flush, window=0.05, max_batch=100):
+        """
+        Initialize the batcher.
+
+        Parameters:
+            flush : callable
+                Called with the list of batched transactions.
+            window : float, optional
+                The longest a transaction waits before its batch is sent,
+                in seconds (default is 0.05).
+            max_batch : int, optional
+                Send the batch immediately once this many transactions are
+                waiting (default is 100).
+        """
+        self.flush = flush
+        self.window = window
+        self.max_batch = max_batch
+        self.pending = []
+        self.timer = None
+        self.lock = threading.Lock()
+
+    def add(self, tx):
+        """
+        Queue a transaction for the next batch.
+
+        Parameters:
+            tx : Transaction
+                The transaction to send.
+        """
+        with self.lock:
+            self.pending.append(tx)
+            if len(self.pending) >= self.max_batch:
+                batch = self._take()
+            else:
+                batch = None
+                if self.timer is None:
+                    self.timer = threading.Timer(self.window, self._on_timer)
+                    self.timer.daemon = True
+                    self.timer.start()
+        if batch:
+            self.flush(batch)
+
+    def _take(self):
+        """
+        Take the pending batch and cancel its timer. Caller holds the lock.
+        """
+        batch, self.pending = self.pending, []
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        return batch
+
+    def _on_timer(self):
+        """
+        Flush whatever accumulated during the window.
+        """
+        with self.lock:
+            batch = self._take()
+        if batch:
+            self.flush(batch)
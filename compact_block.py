@@ -0,0 +1,68 @@
+import hashlib
+
+# short txids are the first 6 bytes (12 hex digits) of a salted hash
+SHORT_ID_LENGTH = 12
+
+
+def short_txid(block_hash, txid):
+    """
+    Compute a transaction's short id within a block.
+
+    The id is salted with the block hash, so collisions cannot be
+    precomputed and differ from block to block.
+
+    Parameters:
+        block_hash : str
+            The hash of the block the transaction is relayed in.
+        txid : str
+            The full transaction id.
+
+    Returns:
+        str
+            The short id as a hex string.
+    """
+    return hashlib.sha256((block_hash + txid).encode()).hexdigest()[:SHORT_ID_LENGTH]
+
+
+def make_compact_block(block):
+    """
+    Encode a block as its header plus one short id per transaction.
+
+    Parameters:
+        block : Block
+            The block to encode.
+
+    Returns:
+        dict
+            {"header": header_data, "short_ids": [short_id, ...]}
+    """
+    return {
+        "header": block.header(),
+        "short_ids": [short_txid(block.hash, tx.txid) for tx in block.transactions],
+    }
+
+
+def reconstruct_transactions(compact, mempool):
+    """
+    Fill in a compact block's transactions from the mempool.
+
+    Parameters:
+        compact : dict
+            A compact block produced by make_compact_block.
+        mempool : Mempool
+            The pending transactions to match short ids against.
+
+    Returns:
+        tuple
+            (transactions, missing) where transactions has a Transaction or
+            None per position and missing lists the positions still needed.
+            Short ids matching more than one pending transaction count as missing.
+    """
+    block_hash = compact["header"]["hash"]
+    candidates = {}
+    for tx in mempool:
+        short_id = short_txid(block_hash, tx.txid)
+        candidates[short_id] = None if short_id in candidates else tx
+    transactions = [candidates.get(short_id) for short_id in compact["short_ids"]]
+    missing = [position for position, tx in enumerate(transactions) if tx is None]
+    return transactions, missing
@@ -0,0 +1,78 @@
+import bisect
+
+
+class HistoryIndex:
+    """
+    Maps each account to the transactions it appears in.
+
+    Every account has a list of (block height, position in block) pairs in
+    chain order, for transactions it sent or received. Blocks are added and
+    removed tip-first, mirroring AccountState, so the index is kept current
+    without rescanning the chain.
+    """
+    def __init__(self):
+        """
+        Initialize an empty index.
+        """
+        self.entries = {}  # { account: [(height, position), ...] in chain order }
+
+    def _accounts(self, tx):
+        return (tx.sender,) if tx.sender == tx.receiver else (tx.sender, tx.receiver)
+
+    def apply_block(self, block):
+        """
+        Index the transactions of a block being connected to the chain.
+
+        Parameters:
+            block : Block
+                The block being connected; must extend the last indexed block.
+        """
+        for position, tx in enumerate(block.transactions):
+            for account in self._accounts(tx):
+                self.entries.setdefault(account, []).append((block.index, position))
+
+    def revert_block(self, block):
+        """
+        Remove the transactions of a block being disconnected from the chain.
+
+        Parameters:
+            block : Block
+                The block being disconnected; must be the last indexed one.
+        """
+        for tx in block.transactions:
+            for account in self._accounts(tx):
+                entries = self.entries[account]
+                entries.pop()
+                if not entries:
+                    del self.entries[account]
+
+    def clear(self):
+        """
+        Forget every indexed transaction.
+        """
+        self.entries.clear()
+
+    def newest_first(self, account, min_height=0, before=None):
+        """
+        Iterate over an account's transactions from newest to oldest.
+
+        Parameters:
+            account : str
+                The account name.
+            min_height : int, optional
+                Stop below this block height (default is 0).
+            before : tuple, optional
+                Only yield entries that sort before this (height, position)
+                pair (default is no upper bound).
+
+        Yields:
+            tuple
+                (height, position) of each transaction.
+        """
+        entries = self.entries.get(account, [])
+        low = bisect.bisect_left(entries, (min_height,))
+        high = len(entries) if before is None else bisect.bisect_left(entries, before)
+        for i in range(high - 1, low - 1, -1):
+            # a concurrent disconnect may have shortened the list
+            if i < len(entries):
+                yield entries[i]
@@ -0,0 +1,89 @@
+import threading
+from collections import OrderedDict
+
+
+class InventoryTracker:
+    """
+    Remembers which block hashes and txids each peer already has.
+
+    An item counts as known to a peer once we announced it to them or
+    heard it from them, so we never announce it to that peer again. The
+    tracker also records which items we are currently fetching, so the
+    same item announced by several peers is only requested once.
+    """
+    def __init__(self, max_items_per_peer=10000):
+        """
+        Initialize an empty tracker.
+
+        Parameters:
+            max_items_per_peer : int, optional
+                How many items to remember per peer before forgetting the
+                oldest ones (default is 10000).
+        """
+        self.max_items_per_peer = max_items_per_peer
+        self.known = {}  # { (host, port): OrderedDict of item ids }
+        self.in_flight = set()
+        self.lock = threading.Lock()
+
+    def mark(self, peer, item):
+        """
+        Record that a peer has an item.
+
+        Parameters:
+            peer : tuple
+                (host, port) of the peer.
+            item : str
+                A block hash or txid.
+        """
+        with self.lock:
+            items = self.known.setdefault(peer, OrderedDict())
+            items[item] = True
+            items.move_to_end(item)
+            if len(items) > self.max_items_per_peer:
+                items.popitem(last=False)
+
+    def knows(self, peer, item):
+        """
+        Check whether a peer is known to have an item.
+
+        Parameters:
+            peer : tuple
+                (host, port) of the peer.
+            item : str
+                A block hash or txid.
+
+        Returns:
+            bool
+                True if we announced the item to the peer or heard it from them.
+        """
+        with self.lock:
+            return item in self.known.get(peer, ())
+
+    def request(self, item):
+        """
+        Claim an item for fetching unless a fetch for it is already in flight.
+
+        Parameters:
+            item : str
+                A block hash or txid.
+
+        Returns:
+            bool
+                True if the caller should fetch the item, False otherwise.
+        """
+        with self.lock:
+            if item in self.in_flight:
+                return False
+            self.in_flight.add(item)
+            return True
+
+    def done(self, items):
+        """
+        Release items whose fetch has finished, whether or not it succeeded.
+
+        Parameters:
+            items : iterable
+                The block hashes or txids that were being fetched.
+        """
+        with self.lock:
+            self.in_flight.difference_update(items)
@@ -0,0 +1,138 @@
+class Mempool:
+    """
+    Pool of pending transactions indexed by txid.
+
+    Keeps a running total of pending debits per sender so admission,
+    duplicate detection and confirmation are constant time per transaction.
+    """
+    def __init__(self, confirmed=None):
+        """
+        Initialize an empty mempool.
+
+        Parameters:
+            confirmed : set[str], optional
+                Txids already confirmed on the chain, kept up to date by the
+                owner; transactions with these ids are never admitted.
+        """
+        self.transactions = {}  # { txid: Transaction }, in arrival order
+        self.confirmed = confirmed if confirmed is not None else set()
+        self.pending_debits = {}  # { sender: total pending amount }
+
+    def add(self, tx):
+        """
+        Add a transaction to the pool unless it is already present or confirmed.
+
+        Parameters:
+            tx : Transaction
+                The transaction to admit.
+
+        Returns:
+            bool
+                True if the transaction was added, False if it was a duplicate.
+        """
+        if tx.txid in self.transactions or tx.txid in self.confirmed:
+            return False
+        self.transactions[tx.txid] = tx
+        self.pending_debits[tx.sender] = self.pending_debits.get(tx.sender, 0) + tx.amount
+        return True
+
+    def add_batch(self, txs, state):
+        """
+        Validate and admit a batch of transactions together.
+
+        Each transaction must have a positive amount, distinct sender and
+        receiver, and be affordable from the sender's confirmed balance
+        minus what the sender already has pending, including earlier
+        transactions in the same batch.
+
+        Parameters:
+            txs : list[Transaction]
+                The transactions to admit, in order.
+            state : AccountState
+                The confirmed account balances.
+
+        Returns:
+            list[Transaction]
+                The transactions that were admitted; duplicates, already
+                confirmed and invalid transactions are skipped.
+        """
+        admitted = []
+        for tx in txs:
+            if tx.txid in self.transactions or tx.txid in self.confirmed:
+                continue
+            if tx.amount <= 0 or tx.sender == tx.receiver:
+                continue
+            if state.get_balance(tx.sender) - self.pending_debit(tx.sender) < tx.amount:
+                continue
+            self.add(tx)
+            admitted.append(tx)
+        return admitted
+
+    def remove(self, txid):
+        """
+        Remove a transaction from the pool by txid.
+
+        Parameters:
+            txid : str
+                The id of the transaction to remove.
+
+        Returns:
+            Transaction or None
+                The removed transaction, or None if it was not pending.
+        """
+        tx = self.transactions.pop(txid, None)
+        if tx is not None:
+            remaining = self.pending_debits[tx.sender] - tx.amount
+            if remaining:
+                self.pending_debits[tx.sender] = remaining
+            else:
+                del self.pending_debits[tx.sender]
+        return tx
+
+    def remove_confirmed(self, block):
+        """
+        Remove every transaction included in a newly confirmed block.
+
+        Parameters:
+            block : Block
+                The block whose transactions are now confirmed.
+        """
+        for tx in block.transactions:
+            self.remove(tx.txid)
+
+    def get(self, txid):
+        """
+        Look up a pending transaction by txid.
+
+        Parameters:
+            txid : str
+                The id of the transaction.
+
+        Returns:
+            Transaction or None
+                The pending transaction, or None if it is not in the pool.
+        """
+        return self.transactions.get(txid)
+
+    def pending_debit(self, sender):
+        """
+        Get the total amount a sender has committed in pending transactions.
+
+        Parameters:
+            sender : str
+                The sending account name.
+
+        Returns:
+            int
+                The sum of pending transaction amounts sent by this account.
+        """
+        return self.pending_debits.get(sender, 0)
+
+    def __contains__(self, tx):
+        return tx.txid in self.transactions
+
+    def __len__(self):
+        return len(self.transactions)
+
+    def __iter__(self):
+        return iter(list(self.transactions.values()))
@@ -0,0 +1,99 @@
+import hashlib
+
+# merkle root of a block with no transactions
+EMPTY_ROOT = "0" * 64
+
+
+def hash_pair(left, right):
+    """
+    Hash two child nodes into their parent node.
+
+    Parameters:
+        left : str
+            Hex digest of the left child.
+        right : str
+            Hex digest of the right child.
+
+    Returns:
+        str
+            Hex digest of the parent node.
+    """
+    return hashlib.sha256((left + right).encode()).hexdigest()
+
+
+def merkle_root(txids):
+    """
+    Compute the Merkle root over a list of transaction ids.
+
+    Levels with an odd number of nodes duplicate their last node.
+
+    Parameters:
+        txids : list[str]
+            Transaction ids in block order.
+
+    Returns:
+        str
+            Hex digest of the Merkle root, or EMPTY_ROOT for no transactions.
+    """
+    if not txids:
+        return EMPTY_ROOT
+    level = list(txids)
+    while len(level) > 1:
+        if len(level) % 2:
+            level.append(level[-1])
+        level = [hash_pair(level[i], level[i + 1]) for i in range(0, len(level), 2)]
+    return level[0]
+
+
+def merkle_proof(txids, position):
+    """
+    Build an inclusion proof for the transaction at a given position.
+
+    Parameters:
+        txids : list[str]
+            Transaction ids in block order.
+        position : int
+            Index of the transaction to prove.
+
+    Returns:
+        list[list]
+            [sibling hash, "left" or "right"] pairs from the leaf up to the
+            root, saying on which side each sibling is combined.
+    """
+    proof = []
+    level = list(txids)
+    while len(level) > 1:
+        if len(level) % 2:
+            level.append(level[-1])
+        if position % 2:
+            proof.append([level[position - 1], "left"])
+        else:
+            proof.append([level[position + 1], "right"])
+        level = [hash_pair(level[i], level[i + 1]) for i in range(0, len(level), 2)]
+        position //= 2
+    return proof
+
+
+def verify_merkle_proof(txid, proof, root):
+    """
+    Check that a transaction is included under a Merkle root.
+
+    Parameters:
+        txid : str
+            The id of the transaction being proven.
+        proof : list[list]
+            The proof returned by merkle_proof.
+        root : str
+            The Merkle root from the block header.
+
+    Returns:
+        bool
+            True if the proof links the transaction to the root, False otherwise.
+    """
+    node = txid
+    for sibling, side in proof:
+        if side == "left":
+            node = hash_pair(sibling, node)
+        else:
+            node = hash_pair(node, sibling)
+    return node == root
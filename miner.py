@@ -0,0 +1,181 @@
+import hashlib
+import multiprocessing
+import time
+
+# how many nonces a worker tries between checks of the stop flag
+CHECK_INTERVAL = 4096
+
+
+def meets_difficulty(digest, difficulty):
+    """
+    Check whether a raw SHA-256 digest has `difficulty` leading zero hex digits.
+
+    Parameters:
+        digest : bytes
+            The raw 32-byte digest.
+        difficulty : int
+            The number of leading zero hex digits required.
+
+    Returns:
+        bool
+            True if the digest satisfies the difficulty, False otherwise.
+    """
+    full_bytes, half_byte = divmod(difficulty, 2)
+    if digest[:full_bytes] != bytes(full_bytes):
+        return False
+    return not half_byte or digest[full_bytes] < 16
+
+
+def search_nonces(prefix, difficulty, start, step, stop_event=None, limit=None):
+    """
+    Search nonces start, start + step, start + 2*step, ... for a valid hash.
+
+    The block payload is hashed once; each attempt copies that hash state
+    and feeds it only the nonce digits.
+
+    Parameters:
+        prefix : bytes
+            The serialized block payload that precedes the nonce.
+        difficulty : int
+            The number of leading zero hex digits required.
+        start : int
+            The first nonce to try.
+        step : int
+            The distance between consecutive nonces tried by this search.
+        stop_event : multiprocessing.Event, optional
+            Checked every CHECK_INTERVAL attempts; the search gives up once it is set.
+        limit : int, optional
+            The maximum number of attempts before giving up.
+
+    Returns:
+        tuple
+            (nonce, block_hash, attempts); nonce and block_hash are None if
+            the search was stopped or hit its limit.
+    """
+    base = hashlib.sha256(prefix)
+    nonce = start
+    attempts = 0
+    while limit is None or attempts < limit:
+        h = base.copy()
+        h.update(str(nonce).encode())
+        attempts += 1
+        digest = h.digest()
+        if meets_difficulty(digest, difficulty):
+            return nonce, digest.hex(), attempts
+        nonce += step
+        if attempts % CHECK_INTERVAL == 0 and stop_event is not None and stop_event.is_set():
+            break
+    return None, None, attempts
+
+
+def _worker(prefix, difficulty, start, step, stop_event, results):
+    """
+    Process entry point: search one interleaved slice of the nonce space
+    and report the outcome on the results queue.
+    """
+    results.put(search_nonces(prefix, difficulty, start, step, stop_event))
+
+
+class Miner:
+    """
+    Proof-of-work search engine.
+
+    Searches nonces over a precomputed block payload, optionally splitting
+    the nonce space across several processes, and records the hash rate
+    of the last search.
+    """
+    def __init__(self, difficulty, workers=1):
+        """
+        Initialize the miner.
+
+        Parameters:
+            difficulty : int
+                The number of leading zero hex digits required.
+            workers : int, optional
+                The number of processes to search with (default is 1, which
+                searches in the calling process).
+        """
+        self.difficulty = difficulty
+        self.workers = workers
+        self.last_stats = None
+
+    def mine(self, prefix):
+        """
+        Find a nonce whose hash, appended to the payload, meets the difficulty.
+
+        Parameters:
+            prefix : bytes
+                The serialized block payload that precedes the nonce.
+
+        Returns:
+            tuple
+                (nonce, block_hash) of the solution.
+        """
+        started = time.time()
+        if self.workers <= 1:
+            nonce, block_hash, attempts = search_nonces(prefix, self.difficulty, 0, 1)
+        else:
+            nonce, block_hash, attempts = self._mine_parallel(prefix)
+        elapsed = time.time() - started
+        self.last_stats = {
+            "hashes": attempts,
+            "seconds": elapsed,
+            "hash_rate": attempts / elapsed if elapsed > 0 else float("inf"),
+        }
+        return nonce, block_hash
+
+    def _mine_parallel(self, prefix):
+        """
+        Split the nonce space across worker processes and stop all of them
+        as soon as one finds a solution.
+
+        Returns:
+            tuple
+                (nonce, block_hash, total attempts across all workers).
+        """
+        stop_event = multiprocessing.Event()
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(
+                target=_worker,
+                args=(prefix, self.difficulty, start, self.workers, stop_event, results),
+                daemon=True,
+            )
+            for start in range(self.workers)
+        ]
+        for process in processes:
+            process.start()
+
+        solution = None
+        attempts = 0
+        for _ in processes:
+            nonce, block_hash, tried = results.get()
+            attempts += tried
+            if nonce is not None and solution is None:
+                solution = (nonce, block_hash)
+                stop_event.set()
+        for process in processes:
+            process.join()
+        return solution[0], solution[1], attempts
+
+
+if __name__ == "__main__":
+    # compare the old rebuild-the-block-per-nonce loop with the miner
+    from block import Block
+    from transaction import Transaction
+
+    attempts = 20000
+    txs = [Transaction(f"peer-{i}", f"peer-{i + 1}", 1) for i in range(100)]
+
+    started = time.time()
+    for nonce in range(attempts):
+        Block(1, "0" * 64, time.time(), txs, nonce)
+    naive_rate = attempts / (time.time() - started)
+
+    prefix = Block(1, "0" * 64, time.time(), txs, 0).hash_prefix()
+    started = time.time()
+    search_nonces(prefix, 64, 0, 1, limit=attempts * 10)
+    engine_rate = attempts * 10 / (time.time() - started)
+
+    print(f"block rebuild loop: {naive_rate:,.0f} H/s")
+    print(f"miner (1 process):  {engine_rate:,.0f} H/s")
@@ -0,0 +1,101 @@
+import threading
+from collections import OrderedDict
+
+
+class OrphanPool:
+    """
+    Holds blocks that arrived before their parent.
+
+    Orphans are indexed by parent hash, so when a block is connected its
+    waiting children can be found directly. The pool is bounded; once
+    full, the oldest orphan is evicted to make room.
+    """
+    def __init__(self, max_size=100):
+        """
+        Initialize an empty pool.
+
+        Parameters:
+            max_size : int, optional
+                The maximum number of orphans kept (default is 100).
+        """
+        self.max_size = max_size
+        self.by_parent = {}  # { parent hash: { block hash: Block } }
+        self.arrival = OrderedDict()  # { block hash: parent hash }, oldest first
+        self.lock = threading.Lock()
+
+    def add(self, block):
+        """
+        Store a block whose parent is unknown, evicting the oldest orphan if full.
+
+        Parameters:
+            block : Block
+                The orphan block.
+
+        Returns:
+            bool
+                True if the block was added, False if it was already pooled.
+        """
+        with self.lock:
+            if block.hash in self.arrival:
+                return False
+            while len(self.arrival) >= self.max_size:
+                oldest, parent = self.arrival.popitem(last=False)
+                self._unlink(oldest, parent)
+                print(f"🗑️ Evicted orphan block {oldest[:10]}")
+            self.arrival[block.hash] = block.previous_hash
+            self.by_parent.setdefault(block.previous_hash, {})[block.hash] = block
+            return True
+
+    def pop_children(self, parent_hash):
+        """
+        Remove and return every orphan waiting on a parent.
+
+        Parameters:
+            parent_hash : str
+                The hash of the block that was just connected.
+
+        Returns:
+            list[Block]
+                The orphans whose previous_hash is parent_hash, oldest first.
+        """
+        with self.lock:
+            children = self.by_parent.pop(parent_hash, {})
+            for block_hash in children:
+                del self.arrival[block_hash]
+            return list(children.values())
+
+    def discard(self, block_hash):
+        """
+        Remove an orphan if it is pooled, e.g. because a sync connected it.
+
+        Parameters:
+            block_hash : str
+                The hash of the block to drop.
+
+        Returns:
+            bool
+                True if the block was pooled, False otherwise.
+        """
+        with self.lock:
+            parent_hash = self.arrival.pop(block_hash, None)
+            if parent_hash is None:
+                return False
+            self._unlink(block_hash, parent_hash)
+            return True
+
+    def _unlink(self, block_hash, parent_hash):
+        """
+        Drop a block from the parent index. Caller holds the lock.
+        """
+        siblings = self.by_parent[parent_hash]
+        del siblings[block_hash]
+        if not siblings:
+            del self.by_parent[parent_hash]
+
+    def __contains__(self, block_hash):
+        with self.lock:
+            return block_hash in self.arrival
+
+    def __len__(self):
+        with self.lock:
+            return len(self.arrival)
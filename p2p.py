@@ -1,10 +1,60 @@
+import asyncio
 import socket
+import struct
 import json
+import threading
 from block import Blockchain
+from block_pipeline import BlockPipeline
 from transaction import Transaction
 
+# every message is a 4-byte big-endian length followed by that many bytes of JSON
+FRAME_HEADER = struct.Struct(">I")
+MAX_FRAME_SIZE = 16 * 1024 * 1024
 
-def start_server(port, blockchain):
+
+def encode_frame(message):
+    """
+    Encode a message as a length-prefixed frame.
+
+    Parameters:
+        message : dict
+            The message to send (will be JSON-encoded).
+
+    Returns:
+        bytes
+            The frame: payload length followed by the JSON payload.
+    """
+    payload = json.dumps(message).encode()
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+async def read_frame(reader):
+    """
+    Read one length-prefixed frame from a stream.
+
+    Parameters:
+        reader : asyncio.StreamReader
+            The connection to read from.
+
+    Returns:
+        dict or None
+            The decoded message, or None if the peer closed the connection
+            between frames.
+    """
+    try:
+        header = await reader.readexactly(FRAME_HEADER.size)
+    except asyncio.IncompleteReadError as e:
+        if e.partial:
+            raise
+        return None
+    (length,) = FRAME_HEADER.unpack(header)
+    if length > MAX_FRAME_SIZE:
+        raise ValueError(f"frame of {length} bytes exceeds the {MAX_FRAME_SIZE} byte limit")
+    payload = await reader.readexactly(length)
+    return json.loads(payload)
+
+
+def start_server(port, blockchain, host='127.0.0.1'):
     """
     Start a TCP server that listens for incoming blockchain messages (transactions/blocks).
 
@@ -13,25 +63,66 @@ def start_server(port, blockchain):
             The port number to listen on.
         blockchain : Blockchain
             The blockchain instance to update with received messages.
+        host : str, optional
+            The address to bind to (default is 127.0.0.1).
+
+    The server runs indefinitely on an asyncio event loop, serving any
+    number of long-lived peer connections at once. Received blocks are
+    validated off the event loop by a BlockPipeline.
+    """
+    asyncio.run(serve(port, blockchain, host))
+
+
+async def serve(port, blockchain, host='127.0.0.1'):
+    """
+    Serve peer connections on the running event loop until cancelled.
 
-    The server runs indefinitely, accepting connections and handling messages.
+    Parameters:
+        port : int
+            The port number to listen on.
+        blockchain : Blockchain
+            The blockchain instance to update with received messages.
+        host : str, optional
+            The address to bind to (default is 127.0.0.1).
     """
-    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    server.bind(('127.0.0.1', port))
-    server.listen(5)
-    print(f"[LISTENING] on 127.0.0.1:{port}")
-    
-    while True:
-        client, addr = server.accept()
-        print(f"[CONNECTION] from {addr}")
-        message = client.recv(1024).decode()
-        if message:
-            message_data = json.loads(message)
-            handle_message(message_data, blockchain)
-        client.close()
+    pipeline = BlockPipeline(blockchain)
+    server = await asyncio.start_server(
+        lambda reader, writer: handle_connection(reader, writer, blockchain, pipeline), host, port
+    )
+    print(f"[LISTENING] on {host}:{port}")
+    async with server:
+        await server.serve_forever()
 
 
-def handle_message(message_data, blockchain):
+async def handle_connection(reader, writer, blockchain, pipeline):
+    """
+    Read and handle frames from one peer connection until it closes.
+
+    Parameters:
+        reader : asyncio.StreamReader
+            The incoming side of the connection.
+        writer : asyncio.StreamWriter
+            The outgoing side of the connection.
+        blockchain : Blockchain
+            The blockchain instance to update with received messages.
+        pipeline : BlockPipeline
+            The pipeline received blocks are queued on.
+    """
+    addr = writer.get_extra_info("peername")
+    print(f"[CONNECTION] from {addr}")
+    try:
+        while True:
+            message_data = await read_frame(reader)
+            if message_data is None:
+                break
+            handle_message(message_data, blockchain, pipeline)
+    except (asyncio.IncompleteReadError, ConnectionError, ValueError) as e:
+        print(f"[DISCONNECT] {addr}: {e}")
+    finally:
+        writer.close()
+
+
+def handle_message(message_data, blockchain, pipeline):
     """
     Process incoming messages and update the blockchain accordingly.
 
@@ -40,24 +131,100 @@ def handle_message(message_data, blockchain):
             The parsed JSON message containing either a transaction or block.
         blockchain : Blockchain
             The blockchain instance to be updated.
+        pipeline : BlockPipeline
+            The pipeline that validates and connects received blocks.
 
     Currently handles:
     - "transaction" type: Adds transaction to pending transactions
-    - "block" type: Placeholder for future block validation logic
+    - "block" type: Queues the block for validation and connection
     """
     if message_data["type"] == "transaction":
         # Handle transaction logic
         transaction = Transaction(**message_data["data"])
         print(f"Received transaction: {transaction}")
-        blockchain.current_transactions.append(transaction)
+        blockchain.mempool.add(transaction)
     elif message_data["type"] == "block":
-        # Handle new block (e.g., validate and add it)
-        pass  # Block handling logic would go here
+        # validation runs on the pipeline's workers, not the event loop
+        pipeline.submit(message_data["data"])
+
+
+class PeerConnection:
+    """
+    A long-lived outgoing connection to one peer, reused for many messages.
+
+    The socket is opened on first use and reopened once if a send finds it
+    broken, e.g. after the peer restarted.
+    """
+    def __init__(self, peer_address):
+        """
+        Initialize an unconnected peer connection.
+
+        Parameters:
+            peer_address : tuple
+                (IP address, port) of the peer node.
+        """
+        self.peer_address = peer_address
+        self.sock = None
+        self.lock = threading.Lock()
+
+    def send(self, message):
+        """
+        Send one framed message, reconnecting once if the connection dropped.
+
+        Parameters:
+            message : dict
+                The message to be sent (will be JSON-encoded).
+        """
+        frame = encode_frame(message)
+        with self.lock:
+            for attempt in range(2):
+                try:
+                    if self.sock is None:
+                        self.sock = socket.create_connection(self.peer_address, timeout=3)
+                    self.sock.sendall(frame)
+                    return
+                except OSError:
+                    self.close()
+                    if attempt:
+                        raise
+
+    def close(self):
+        """
+        Close the underlying socket, if open.
+        """
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+
+connections = {}  # { (IP address, port): PeerConnection }
+connections_lock = threading.Lock()
+
+
+def get_connection(peer_address):
+    """
+    Get the shared connection to a peer, creating it on first use.
+
+    Parameters:
+        peer_address : tuple
+            (IP address, port) of the peer node.
+
+    Returns:
+        PeerConnection
+            The connection reused for every message to this peer.
+    """
+    peer_address = tuple(peer_address)
+    with connections_lock:
+        connection = connections.get(peer_address)
+        if connection is None:
+            connection = PeerConnection(peer_address)
+            connections[peer_address] = connection
+        return connection
 
 
 def send_message(peer_address, message):
     """
-    Send a JSON-encoded message to a specific peer node.
+    Send a JSON-encoded message to a specific peer node over its persistent connection.
 
     Parameters:
         peer_address : tuple
@@ -65,10 +232,7 @@ def send_message(peer_address, message):
         message : dict
             The message to be sent (will be JSON-encoded).
     """
-    client = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    client.connect(peer_address)
-    client.send(json.dumps(message).encode())
-    client.close()
+    get_connection(peer_address).send(message)
 
 
 def broadcast_block(block, peers):
@@ -83,7 +247,7 @@ def broadcast_block(block, peers):
     """
     message = {
         "type": "block",
-        "data": block.__dict__,
+        "data": block.to_dict(),
     }
     for peer in peers:
         send_message(peer, message)
@@ -101,8 +265,7 @@ def broadcast_transaction(transaction, peers):
     """
     message = {
         "type": "transaction",
-        "data": transaction.__dict__,
+        "data": transaction.to_dict(),
     }
     for peer in peers:
         send_message(peer, message)
-
@@ -1,7 +1,17 @@
 # peer.py
-from flask import Flask, request, jsonify, render_template_string, redirect
-import threading, requests, time, json
-from block import Blockchain
+from flask import Flask, Response, request, jsonify, redirect
+import threading, requests, time, json, os
+from collections import OrderedDict
+from concurrent.futures import (ThreadPoolExecutor, ProcessPoolExecutor, as_completed,
+                                TimeoutError as FuturesTimeout)
+from block import Blockchain, hash_header, find_hash_mismatch
+from block_store import BlockStore
+from snapshot import SnapshotStore
+from broadcaster import Broadcaster, TransactionBatcher
+from inventory import InventoryTracker
+from orphans import OrphanPool
+from compact_block import make_compact_block, reconstruct_transactions
+from wire import WIRE_MIME, encode_blocks, decode_block, decode_blocks, decode_transaction
 from transaction import Transaction
 import sys
 
@@ -25,15 +35,44 @@ PEER_NAME = f"peer-{PORT}"
 
 TRACKER_HOST = sys.argv[1]
 TRACKER_PORT = 8000
+# friend group to join; peers only see members of their own group
+GROUP_CODE = sys.argv[3] if len(sys.argv) > 3 else "default"
 
 INIT_BALANCE = 150
 
-balances = {}
+MINING_WORKERS = 1
 
-balances[PEER_NAME] = INIT_BALANCE
+# blocks are persisted here so a restart only has to fetch what it missed
+DATA_DIR = os.path.join("data", PEER_NAME)
+SNAPSHOT_INTERVAL = 100
+# a fresh peer only bootstraps from a snapshot this many peers serve identically
+SNAPSHOT_CONFIRMATIONS = 2
 
-blockchain = Blockchain(difficulty=2)
+blockchain = Blockchain(
+    difficulty=2,
+    initial_balance=INIT_BALANCE,
+    mining_workers=MINING_WORKERS,
+    store=BlockStore(DATA_DIR),
+    snapshots=SnapshotStore(os.path.join(DATA_DIR, "snapshots"), SNAPSHOT_INTERVAL),
+)
+blockchain.state.register(PEER_NAME)
+# held by anything that changes the chain (block acceptance, orphan
+# connection, reorgs, mining, snapshot loads); reentrant because those
+# paths call each other
+chain_lock = threading.RLock()
 peers = set()
+# local cache of the tracker's membership, kept current by its pushes and
+# a long-poll, so nothing on the block path has to ask the tracker
+peer_names = {}  # { (host, port): name }
+# tracker membership version our peer list reflects
+peers_version = 0
+peers_lock = threading.Lock()
+# how long each membership long-poll waits at the tracker, and the pause
+# after a failed one
+MEMBERSHIP_POLL_WAIT = 25
+MEMBERSHIP_RETRY_DELAY = 5
+# the tracker evicts peers that miss heartbeats for its lease TTL (30s)
+HEARTBEAT_INTERVAL = 10
 
 HTML = """
 <!DOCTYPE html>
@@ -140,7 +179,30 @@ HTML = """
         {% endfor %}
     </ul>
 
+    {{ chain_html|safe }}
+
+    <h3>Add Transaction</h3>
+    <form method="POST" action="/add_transaction">
+        Sender: <input name="sender" required><br>
+        Receiver: <input name="receiver" required><br>
+        Amount: <input name="amount" type="number" required><br>
+        <input type="submit" value="Submit">
+    </form>
+
+    <h3><a href="/mine">⛏️ Mine New Block</a></h3>
+    <h3><a href="/peers">🔗 View Peers</a></h3>
+</body>
+</html> 
+"""
+
+# the chain section of the dashboard, rendered one page at a time
+CHAIN_HTML = """
     <h3>Blockchain</h3>
+    <p>
+        Blocks {{ first }}–{{ last }} | Page {{ page }} of {{ pages }} |
+        {% if page > 1 %}<a href="/?page={{ page - 1 }}">← Newer</a>{% endif %}
+        {% if page < pages %}<a href="/?page={{ page + 1 }}">Older →</a>{% endif %}
+    </p>
     <ul>
         {% for block in chain %}
             <li>
@@ -159,24 +221,70 @@ HTML = """
             </li>
         {% endfor %}
     </ul>
+"""
 
-    <h3>Add Transaction</h3>
-    <form method="POST" action="/add_transaction">
-        Sender: <input name="sender" required><br>
-        Receiver: <input name="receiver" required><br>
-        Amount: <input name="amount" type="number" required><br>
-        <input type="submit" value="Submit">
-    </form>
+# templates are compiled once at startup instead of on every request
+dashboard_template = app.jinja_env.from_string(HTML)
+chain_template = app.jinja_env.from_string(CHAIN_HTML)
 
-    <h3><a href="/mine">⛏️ Mine New Block</a></h3>
-    <h3><a href="/peers">🔗 View Peers</a></h3>
-</body>
-</html> 
-"""
+# the dashboard shows DASHBOARD_PAGE_SIZE blocks per page, newest first;
+# rendered pages are cached by (tip hash, page), so a new tip invalidates them
+DASHBOARD_PAGE_SIZE = 20
+CHAIN_FRAGMENT_CACHE_SIZE = 64
+chain_fragments = OrderedDict()  # { (tip hash, page): html }
+chain_fragments_lock = threading.Lock()
+
+# default and largest page sizes for the JSON ledger API
+API_PAGE_SIZE = 50
+MAX_API_PAGE_SIZE = 500
 
 
 REQUIRED_KEYS = ['hash', 'previous_hash']
 
+# Accept header for peer-to-peer fetches: binary preferred, JSON for older peers
+BINARY_ACCEPT = f"{WIRE_MIME}, application/json;q=0.5"
+
+# downloaded chains at least this long have their hashes recomputed
+# across VALIDATION_WORKERS processes instead of in this one. The pool is
+# long-lived and its workers are forked in start(), before the server and
+# background threads exist. It is only used with more than one core: on
+# one core the extra processes measured slower (see python block.py).
+VALIDATION_WORKERS = os.cpu_count() or 1
+PARALLEL_VALIDATION_MIN_BLOCKS = 2000
+validation_pool = ProcessPoolExecutor(max_workers=VALIDATION_WORKERS) if VALIDATION_WORKERS > 1 else None
+
+# cap on how much a single /headers or /blocks response may carry
+MAX_HEADERS = 2000
+MAX_BLOCKS = 500
+
+# peers are queried for their tips concurrently, with an overall deadline
+PEER_QUERY_WORKERS = 8
+PEER_QUERY_DEADLINE = 3
+peer_query_pool = ThreadPoolExecutor(max_workers=PEER_QUERY_WORKERS)
+
+# outgoing blocks and transactions go through one long-lived sender with
+# per-peer keep-alive connections and a bounded queue
+BROADCAST_WORKERS = 8
+BROADCAST_QUEUE_SIZE = 1000
+broadcaster = Broadcaster(workers=BROADCAST_WORKERS, queue_size=BROADCAST_QUEUE_SIZE)
+
+# which block hashes / txids each peer has announced to us or heard from us
+inventory = InventoryTracker()
+
+# announced items are fetched and processed here rather than on the
+# broadcaster's send workers, since processing a block may mean a sync
+FETCH_WORKERS = 4
+fetch_pool = ThreadPoolExecutor(max_workers=FETCH_WORKERS)
+
+# blocks that arrived before their parent, waiting to be connected
+ORPHAN_POOL_SIZE = 100
+orphans = OrphanPool(max_size=ORPHAN_POOL_SIZE)
+
+# outgoing transactions are coalesced for up to TX_BATCH_WINDOW seconds
+# or TX_BATCH_SIZE transactions, whichever comes first
+TX_BATCH_WINDOW = 0.05
+TX_BATCH_SIZE = 100
+
 def is_valid_chain(chain_data):
     """
     Validate the integrity of a blockchain.
@@ -185,41 +293,78 @@ def is_valid_chain(chain_data):
         chain_data (list): List of block dictionaries to validate
         
     Returns:
-        bool: True if chain is valid, False otherwise
+        bool: True if chain is valid, False otherwise (including when a
+              block is malformed)
         
     Validation checks:
     1. Required fields present in each block
     2. Correct hash linking between blocks
     3. Valid proof-of-work (leading zeros)
     4. Hash recalculation matches stored hash
+    
+    The first block is the anchor the rest must link to and is not checked
+    itself; sync_from_peer passes our own block at the fork point, so only
+    the peer's blocks above it are validated. Recomputing the hashes of a
+    long chain is spread across validation_pool's processes, if any.
     """
-    for i in range(1, len(chain_data)):
-        prev = chain_data[i - 1]
-        curr = chain_data[i]
+    try:
+        for i in range(1, len(chain_data)):
+            prev = chain_data[i - 1]
+            curr = chain_data[i]
 
-        for key in REQUIRED_KEYS:
-            if key not in curr:
-                print(f"Block {i} is missing key: {key}")
+            for key in REQUIRED_KEYS:
+                if key not in curr:
+                    print(f"Block {i} is missing key: {key}")
+                    return False
+                if key not in prev and key == 'hash':
+                    print(f"Previous block {i-1} is missing key: 'hash'")
+                    return False
+
+            # check hash linkage
+            if curr['previous_hash'] != prev['hash'] or curr.get('index') != prev['index'] + 1:
                 return False
-            if key not in prev and key == 'hash':
-                print(f"Previous block {i-1} is missing key: 'hash'")
+        
+            # check proof of work (must have N difficulty leading zeros)
+            if not curr['hash'].startswith('0' * blockchain.difficulty):
+                print(f"Block {i} has invalid proof of work: {curr['hash']}")
                 return False
-
-        # check hash linkage
-        if curr['previous_hash'] != prev['hash']:
+    
+        # recalculate the hashes to verify
+        suffix = chain_data[1:]
+        pool = validation_pool if len(suffix) >= PARALLEL_VALIDATION_MIN_BLOCKS else None
+        mismatch = find_hash_mismatch(suffix, pool)
+        if mismatch is not None:
+            print(f"Block {1 + mismatch} hash verification failed")
             return False
+    except (KeyError, TypeError, ValueError, AttributeError) as e:
+        print(f"Malformed block data: {e!r}")
+        return False
+
+    return True
+
+
+def is_valid_header_chain(headers):
+    """
+    Validate a run of block headers without their transaction bodies.
+    
+    Args:
+        headers (list): Consecutive header dictionaries, starting from genesis
         
-        # check proof of work (must have N difficulty leading zeros)
-        if not curr['hash'].startswith('0' * blockchain.difficulty):
-            print(f"Block {i} has invalid proof of work: {curr['hash']}")
+    Returns:
+        bool: True if every header hashes correctly, meets the proof of work
+              and links to the one before it
+    """
+    if not headers or headers[0]["hash"] != blockchain.chain[0].hash:
+        return False
+    for i in range(1, len(headers)):
+        prev = headers[i - 1]
+        curr = headers[i]
+        if curr["previous_hash"] != prev["hash"] or curr["index"] != i:
             return False
-        
-        # recalculate the hash to verify
-        block_obj = blockchain.create_block_from_dict(curr)
-        if block_obj.hash != curr['hash']:
-            print(f"Block {i} hash verification failed")
+        if not curr["hash"].startswith('0' * blockchain.difficulty):
+            return False
+        if hash_header(curr) != curr["hash"]:
             return False
-
     return True
 
 
@@ -230,23 +375,205 @@ def index():
     - Current peer name
     - Account balances
     - Pending transactions
-    - Blockchain status
+    - Blockchain status, one page of blocks (?page=N), newest first
     - Transaction submission form
     """
-    if PEER_NAME not in balances:
-        balances[PEER_NAME] = INIT_BALANCE
+    blockchain.state.register(PEER_NAME)
         
-    return render_template_string(
-        HTML, 
-        chain=blockchain.chain, 
+    return dashboard_template.render(
+        chain_html=render_chain_page(request.args.get("page", 1, type=int)),
         peer_name=PEER_NAME,
-        balances=balances,
-        pending_txs=blockchain.current_transactions
+        balances=blockchain.state.balances,
+        pending_txs=list(blockchain.mempool)
+    )
+
+def render_chain_page(page):
+    """
+    Render one page of the dashboard's chain view, newest blocks first.
+    Pages are memoized by tip hash, so only the first view after a new
+    block pays for rendering.
+    
+    Args:
+        page (int): The 1-based page number; out-of-range pages are clamped
+        
+    Returns:
+        str: The rendered HTML fragment
+    """
+    chain = blockchain.chain
+    tip = chain[-1]
+    pages = (len(chain) + DASHBOARD_PAGE_SIZE - 1) // DASHBOARD_PAGE_SIZE
+    page = min(max(page, 1), pages)
+    key = (tip.hash, page)
+    with chain_fragments_lock:
+        if key in chain_fragments:
+            chain_fragments.move_to_end(key)
+            return chain_fragments[key]
+    
+    top = tip.index - (page - 1) * DASHBOARD_PAGE_SIZE
+    bottom = max(top - DASHBOARD_PAGE_SIZE + 1, 0)
+    html = chain_template.render(
+        chain=chain[bottom:top + 1][::-1],
+        page=page,
+        pages=pages,
+        first=top,
+        last=bottom
     )
+    with chain_fragments_lock:
+        chain_fragments[key] = html
+        if len(chain_fragments) > CHAIN_FRAGMENT_CACHE_SIZE:
+            chain_fragments.popitem(last=False)
+    return html
+
+def api_page_size():
+    """
+    Read the ?limit= page size for the JSON ledger API.
+    
+    Returns:
+        int: The requested size, clamped to 1..MAX_API_PAGE_SIZE
+    """
+    return min(max(request.args.get("limit", API_PAGE_SIZE, type=int), 1), MAX_API_PAGE_SIZE)
+
+@app.route('/api/blocks', methods=['GET'])
+def api_blocks():
+    """
+    Return one page of blocks, newest first.
+    
+    Query parameters:
+        cursor (int): Height of the first block to return (default: our tip)
+        limit (int): Blocks per page (default API_PAGE_SIZE)
+        
+    Returns:
+        JSON: {"blocks": [block_data, ...], "next_cursor": int or null}
+              where next_cursor fetches the following (older) page
+    """
+    tip_height = len(blockchain.chain) - 1
+    cursor = min(request.args.get("cursor", tip_height, type=int), tip_height)
+    if cursor < 0:
+        return jsonify({"blocks": [], "next_cursor": None})
+    bottom = max(cursor - api_page_size() + 1, 0)
+    blocks = [blockchain.chain[h].to_dict() for h in range(cursor, bottom - 1, -1)]
+    return jsonify({
+        "blocks": blocks,
+        "next_cursor": bottom - 1 if bottom > 0 else None
+    })
+
+@app.route('/api/transactions', methods=['GET'])
+def api_transactions():
+    """
+    Return one page of confirmed transactions, newest first.
+    
+    Query parameters:
+        cursor (str): "height:position" of the first transaction to return
+                      (default: the last transaction at our tip)
+        limit (int): Transactions per page (default API_PAGE_SIZE)
+        
+    Returns:
+        JSON: {"transactions": [tx_data, ...], "next_cursor": str or null}
+              where each tx_data also carries txid, height and position.
+              Blocks at or below pruned_height only have their headers
+              and are not listed.
+    """
+    chain = blockchain.chain
+    limit = api_page_size()
+    try:
+        if "cursor" in request.args:
+            height, position = (int(part) for part in request.args["cursor"].split(":"))
+        else:
+            height, position = len(chain) - 1, None
+    except ValueError:
+        return jsonify({"status": "invalid cursor"}), 400
+    
+    height = min(height, len(chain) - 1)
+    transactions = []
+    next_cursor = None
+    # genesis has no transactions and pruned blocks have no bodies
+    while height > blockchain.pruned_height:
+        txs = chain[height].transactions
+        if position is None or position >= len(txs):
+            position = len(txs) - 1
+        while position >= 0:
+            if len(transactions) == limit:
+                next_cursor = f"{height}:{position}"
+                break
+            tx = txs[position]
+            transactions.append(dict(tx.to_dict(), txid=tx.txid, height=height, position=position))
+            position -= 1
+        if next_cursor:
+            break
+        height, position = height - 1, None
+    return jsonify({"transactions": transactions, "next_cursor": next_cursor})
+
+@app.route('/history/<account>', methods=['GET'])
+def account_history(account):
+    """
+    Return one page of an account's transaction history, newest first.
+    
+    Query parameters:
+        min_height, max_height (int): Only blocks in this height range
+        since, until (float): Only transactions timestamped in this range
+        cursor (str): "height:position" of the first transaction to return
+        limit (int): Transactions per page (default API_PAGE_SIZE)
+    
+    The height range and cursor are looked up in the account's history
+    index directly. Transaction timestamps are not ordered along the
+    chain, so since/until are applied while scanning the account's
+    entries in that range; narrow it with min_height/max_height to keep
+    a timestamp query cheap.
+        
+    Returns:
+        JSON: {"account": str, "transactions": [tx_data, ...],
+               "next_cursor": str or null, "pruned_height": int}
+              where each tx_data also carries txid, height, position and
+              direction ("sent" or "received"). Blocks at or below
+              pruned_height were bootstrapped from a snapshot and are not
+              in the history.
+    """
+    args = request.args
+    limit = api_page_size()
+    try:
+        min_height = int(args.get("min_height", 0))
+        since = float(args["since"]) if "since" in args else None
+        until = float(args["until"]) if "until" in args else None
+        before = (int(args["max_height"]) + 1,) if "max_height" in args else None
+    except ValueError:
+        return jsonify({"status": "invalid range"}), 400
+    if "cursor" in args:
+        try:
+            height, position = (int(part) for part in args["cursor"].split(":"))
+        except ValueError:
+            return jsonify({"status": "invalid cursor"}), 400
+        if before is None or (height, position + 1) < before:
+            before = (height, position + 1)
+    
+    chain = blockchain.chain
+    transactions = []
+    next_cursor = None
+    for height, position in blockchain.history.newest_first(account, min_height, before):
+        if len(transactions) == limit:
+            next_cursor = f"{height}:{position}"
+            break
+        tx = chain[height].transactions[position]
+        if since is not None and tx.timestamp < since:
+            continue
+        if until is not None and tx.timestamp > until:
+            continue
+        transactions.append(dict(
+            tx.to_dict(),
+            txid=tx.txid,
+            height=height,
+            position=position,
+            direction="sent" if tx.sender == account else "received"
+        ))
+    return jsonify({
+        "account": account,
+        "transactions": transactions,
+        "next_cursor": next_cursor,
+        "pruned_height": blockchain.pruned_height
+    })
 
 def get_effective_balance(peer_name):
     """
-    Calculate confirmed balance based on blockchain transactions only.
+    Look up the confirmed balance from the chain's account state.
     
     Args:
         peer_name (str): Name of peer to calculate balance for
@@ -254,15 +581,7 @@ def get_effective_balance(peer_name):
     Returns:
         int: Current confirmed balance (excluding pending transactions)
     """
-
-    balance = INIT_BALANCE
-    for block in blockchain.chain:
-        for tx in block.transactions:
-            if tx.sender == peer_name:
-                balance -= tx.amount
-            elif tx.receiver == peer_name:
-                balance += tx.amount
-    return balance
+    return blockchain.state.get_balance(peer_name)
 
 @app.route('/add_transaction', methods=['POST'])
 def add_transaction():
@@ -291,25 +610,19 @@ def add_transaction():
         return "Sender and receiver must be different", 400
         
     # initialize balances if needed
-    if sender not in balances:
-        balances[sender] = INIT_BALANCE
-    if receiver not in balances:
-        balances[receiver] = INIT_BALANCE
+    blockchain.state.register(sender)
+    blockchain.state.register(receiver)
         
     # check sender balance
     confirmed_balance = get_effective_balance(sender)
-    pending_debits = sum(
-        tx.amount for tx in blockchain.current_transactions
-        if tx.sender == sender
-    )
+    pending_debits = blockchain.mempool.pending_debit(sender)
     if confirmed_balance - pending_debits < amount:
         return "Insufficient balance", 400
         
     tx = Transaction(sender, receiver, amount)
-    if tx not in blockchain.current_transactions:
-        blockchain.current_transactions.append(tx)
+    if blockchain.mempool.add(tx):
         # broadcast to network
-        threading.Thread(target=broadcast_transaction, args=(tx,)).start()
+        broadcast_transaction(tx)
     else:
         print("Transaction already in pending pool")
     return redirect("/")
@@ -317,39 +630,15 @@ def add_transaction():
 
 def recalculate_balances():
     """
-    Recompute all peer balances based on:
-    1. Initial balances from tracker
-    2. Confirmed transactions in blockchain
+    Make sure every peer known to the tracker has a balance entry.
     
-    Updates the global balances dictionary.
+    Confirmed transactions are already applied to the account state
+    as blocks are added, so no chain replay is needed here. Names come
+    from the local membership cache, so this never waits on the tracker.
     """
-    global balances
-    
-    # get all known peers from tracker
-    try:
-        url = f"http://{TRACKER_HOST}:{TRACKER_PORT}/peer_info"
-        res = requests.get(url)
-        if res.status_code == 200:
-            peer_names = [info['name'] for info in res.json().values()]
-            # initialize all known peers with base balance
-            balances = {name: INIT_BALANCE for name in peer_names}
-    except Exception as e:
-        print(f"⚠️ Could not fetch peer info: {e}")
-
-        balances = {name: INIT_BALANCE for name in balances}
-    
-    # apply all transactions from blockchain
-    for block in blockchain.chain:
-        for tx in block.transactions:
-            # ensure sender and receiver exist
-            if tx.sender not in balances:
-                balances[tx.sender] = INIT_BALANCE
-            if tx.receiver not in balances:
-                balances[tx.receiver] = INIT_BALANCE
-                
-            # apply transaction
-            balances[tx.sender] -= tx.amount
-            balances[tx.receiver] += tx.amount
+    # initialize all known peers with base balance
+    for name in list(peer_names.values()):
+        blockchain.state.register(name)
 
 
 @app.route('/mine')
@@ -365,22 +654,27 @@ def mine():
     
     Redirects to dashboard after completion.
     """
-    if not blockchain.current_transactions:
-        return "No transactions to mine", 400
+    with chain_lock:
+        if not blockchain.mempool:
+            return "No transactions to mine", 400
+            
+        # mine all pending transactions at once
+        last_block = blockchain.get_last_block()
+        new_block = blockchain.mine()
         
-    # mine all pending transactions at once
-    last_block = blockchain.get_last_block()
-    new_block = blockchain.mine()
-    
-    # check if mining was successful
-    if new_block is None:
-        return "Mining failed - no new block created", 400
-    
-    # verify we actually mined a new block
-    if new_block.index == last_block.index:
-        return "Mining failed - same block index", 400
-    
-    recalculate_balances()
+        # check if mining was successful
+        if new_block is None:
+            return "Mining failed - no new block created", 400
+        
+        # verify we actually mined a new block
+        if new_block.index == last_block.index:
+            return "Mining failed - same block index", 400
+        
+        stats = blockchain.miner.last_stats
+        print(f"⛏️ Mined block {new_block.index}: {stats['hashes']} hashes in "
+              f"{stats['seconds']:.3f}s ({stats['hash_rate']:,.0f} H/s)")
+        
+        recalculate_balances()
     
     # broadcast the new block to all peers
     broadcast_block(new_block)
@@ -390,27 +684,106 @@ def mine():
 @app.route('/update_peers', methods=['POST'])
 def update_peers():
     """
-    Update peer list from tracker/network.
+    Apply a membership delta pushed by the tracker.
     
     Expected JSON:
     {
-        "peers": [(host, port), ...],
-        "peer_names": [name1, name2, ...] 
+        "version": int,
+        "added": [{"host": str, "port": int, "name": str}, ...],
+        "removed": [{"host": str, "port": int}, ...]
     }
     
-    Also initializes balances for new peers.
+    Also initializes balances for new peers. If the delta skips a version
+    we missed a push, and the missing changes are pulled from the tracker.
     """
-    global peers, balances
-    data = request.get_json()
-    peers = set(tuple(p) for p in data.get("peers", []))
-    
-    # initialize balances for new peers
-    for peer_name in data.get("peer_names", []):
-        if peer_name not in balances:
-            balances[peer_name] = INIT_BALANCE
-            
+    delta = request.get_json()
+    if not apply_membership_delta(delta):
+        # pull in the background so the tracker's push is not held up
+        broadcaster.submit(pull_membership)
     return jsonify({"status": "ok"}), 200
 
+def apply_membership_delta(delta):
+    """
+    Apply one tracker membership delta if it is the next version.
+    
+    Args:
+        delta (dict): {"version": int, "added": [...], "removed": [...]}
+        
+    Returns:
+        bool: False if versions are missing before this delta, True otherwise
+    """
+    global peers, peer_names, peers_version
+    with peers_lock:
+        if delta["version"] <= peers_version:
+            return True
+        if delta["version"] != peers_version + 1:
+            return False
+        # swap in new containers so concurrent iterations never see them change
+        names = dict(peer_names)
+        for entry in delta["added"]:
+            names[(entry["host"], entry["port"])] = entry["name"]
+            blockchain.state.register(entry["name"])
+        for entry in delta["removed"]:
+            names.pop((entry["host"], entry["port"]), None)
+        peer_names = names
+        peers = set(names)
+        peers_version = delta["version"]
+        return True
+
+def set_membership(version, members):
+    """
+    Replace our peer list with the tracker's full membership.
+    
+    Args:
+        version (int): The membership version the list corresponds to
+        members (list): [{"host": str, "port": int, "name": str}, ...]
+    """
+    global peers, peer_names, peers_version
+    with peers_lock:
+        for entry in members:
+            blockchain.state.register(entry["name"])
+        peer_names = {(entry["host"], entry["port"]): entry["name"] for entry in members}
+        peers = set(peer_names)
+        peers_version = version
+
+def pull_membership(wait=0):
+    """
+    Fetch the membership changes we are missing from the tracker.
+    
+    Args:
+        wait (float): Seconds the tracker may hold the request open
+                      waiting for a change (default 0)
+        
+    Returns:
+        bool: True if our peer list changed
+    """
+    url = f"http://{TRACKER_HOST}:{TRACKER_PORT}/peers_since"
+    params = {"group": GROUP_CODE, "version": peers_version, "wait": wait}
+    res = requests.get(url, params=params, timeout=wait + 3)
+    if res.status_code == 304:
+        return False
+    res.raise_for_status()
+    data = res.json()
+    if data.get("full"):
+        set_membership(data["version"], data["peers"])
+    else:
+        for delta in data["changes"]:
+            apply_membership_delta(delta)
+    return True
+
+def watch_membership():
+    """
+    Keep the membership cache current by long-polling the tracker.
+    Catches changes whose push never reached us. Runs forever on its own
+    thread; tracker outages only delay membership updates.
+    """
+    while True:
+        try:
+            pull_membership(wait=MEMBERSHIP_POLL_WAIT)
+        except Exception as e:
+            print(f"⚠️ Could not poll tracker membership: {e}")
+            time.sleep(MEMBERSHIP_RETRY_DELAY)
+
 
 @app.route('/receive_transaction', methods=['POST'])
 def receive_transaction():
@@ -425,24 +798,86 @@ def receive_transaction():
     
     Validates and adds transaction if new.
     Rebroadcasts if not from another peer.
+    
+    A body sent as WIRE_MIME is a single binary-encoded transaction from a peer.
     """
-    tx_data = request.get_json()
+    if request.mimetype == WIRE_MIME:
+        tx_data = {"data": decode_transaction(request.get_data()), "from_peer": True}
+    else:
+        tx_data = request.get_json()
     if "data" not in tx_data:
         return jsonify({"status": "invalid data"}), 400
         
     tx = Transaction(**tx_data["data"])
+    status, code = accept_transaction(tx)
     
-    # check if transaction already exists
-    if tx in blockchain.current_transactions:
-        return jsonify({"status": "transaction already exists"}), 200
+    if status == "received" and not tx_data.get("from_peer", False):
+        broadcast_transaction(tx)
         
-    # validate transaction
-    blockchain.current_transactions.append(tx)
+    return jsonify({"status": status}), code
+
+def accept_transaction(tx):
+    """
+    Add a transaction received from the network to the mempool.
     
-    if not tx_data.get("from_peer", False):
-        threading.Thread(target=broadcast_transaction, args=(tx,)).start()
+    Args:
+        tx (Transaction): The received transaction
         
-    return jsonify({"status": "received"}), 200
+    Returns:
+        tuple: (status message, HTTP status code)
+    """
+    # check if transaction already exists
+    if tx in blockchain.mempool:
+        return "transaction already exists", 200
+    if tx.txid in blockchain.confirmed_txids:
+        return "transaction already confirmed", 200
+    if not accept_transactions([tx]):
+        return "invalid transaction", 400
+    return "received", 200
+
+@app.route('/receive_transactions', methods=['POST'])
+def receive_transactions():
+    """
+    Receive a batch of transactions from another peer.
+    
+    Expected JSON:
+    {
+        "transactions": [transaction_data, ...],
+        "sender": {"port": int}
+    }
+    
+    The batch is validated and admitted to the mempool together.
+    """
+    data = request.get_json()
+    if "transactions" not in data:
+        return jsonify({"status": "invalid data"}), 400
+    
+    try:
+        txs = [Transaction(**tx_data) for tx_data in data["transactions"]]
+    except Exception as e:
+        return jsonify({"status": f"invalid transaction data: {str(e)}"}), 400
+    if "sender" in data:
+        peer = (request.remote_addr, data["sender"]["port"])
+        for tx in txs:
+            inventory.mark(peer, tx.txid)
+    
+    admitted = accept_transactions(txs)
+    return jsonify({"status": "received", "admitted": len(admitted)}), 200
+
+def accept_transactions(txs):
+    """
+    Validate a batch of received transactions and admit the valid ones.
+    
+    Args:
+        txs (list): The received transactions, in order
+        
+    Returns:
+        list: The transactions that were added to the mempool
+    """
+    # under the chain lock so a block confirming them cannot land between
+    # the confirmed-txid check and the admission
+    with chain_lock:
+        return blockchain.mempool.add_batch(txs, blockchain.state)
 
 @app.route('/receive_block', methods=['POST'])
 def receive_block():
@@ -460,46 +895,104 @@ def receive_block():
     - Duplicate blocks
     - Chain extensions
     - Fork resolution
+    
+    A body sent as WIRE_MIME is a single binary-encoded block.
     """
-    data = request.get_json()
-    block_data = data["data"]
-    sender = data.get("sender")
-    force = data.get("force", False)
+    peer = None
+    if request.mimetype == WIRE_MIME:
+        block_data = decode_block(request.get_data())
+    else:
+        data = request.get_json()
+        block_data = data["data"]
+        if "sender" in data:
+            peer = (request.remote_addr, data["sender"]["port"])
+    status, code = accept_block(block_data, peer)
+    return jsonify({"status": status}), code
 
+def accept_block(block_data, peer=None):
+    """
+    Validate a block received from the network and connect it to our chain.
+    
+    A block whose parent we do not have is kept in the orphan pool while
+    the missing ancestors are fetched from the peer that sent it.
+    
+    Args:
+        block_data (dict): The block, as produced by Block.to_dict()
+        peer (tuple, optional): (host, port) of the peer that sent the block
+        
+    Returns:
+        tuple: (status message, HTTP status code)
+    """
     # check if block already exists
-    if any(block.hash == block_data["hash"] for block in blockchain.chain):
+    if blockchain.has_block(block_data["hash"]):
         # Remove any transactions that are in this block
-        blockchain.current_transactions = [
-            tx for tx in blockchain.current_transactions
-            if not any(
-                block_tx.sender == tx.sender and 
-                block_tx.receiver == tx.receiver and
-                block_tx.amount == tx.amount
-                for block_tx in [Transaction(**tx_data) for tx_data in block_data["transactions"]]
-            )
-        ]
-        return jsonify({"status": "block already exists"}), 200
+        for tx_data in block_data["transactions"]:
+            blockchain.mempool.remove(Transaction(**tx_data).txid)
+        return "block already exists", 200
 
     try:
         new_block = blockchain.create_block_from_dict(block_data)
     except Exception as e:
-        return jsonify({"status": f"invalid block data: {str(e)}"}), 400
+        return f"invalid block data: {str(e)}", 400
+    
+    # the recomputed hash must match the announced one
+    if new_block.hash != block_data["hash"]:
+        return "block hash mismatch", 400
     
     # validate proof of work
     if not new_block.hash.startswith('0' * blockchain.difficulty):
-        return jsonify({"status": "invalid proof of work"}), 400
+        return "invalid proof of work", 400
 
-    # case 1: vlock extends current chain
-    if new_block.previous_hash == blockchain.get_last_block().hash:
-        blockchain.add_block(new_block)
+    with chain_lock:
+        if blockchain.has_block(new_block.hash):
+            return "block already exists", 200
         
-        blockchain.current_transactions = []
-        recalculate_balances()
-        return jsonify({"status": "block added"}), 200
+        # case 1: vlock extends current chain
+        if new_block.previous_hash == blockchain.get_last_block().hash:
+            blockchain.add_block(new_block)
+            connect_orphans()
+            recalculate_balances()
+            return "block added", 200
+        
+        is_orphan = not blockchain.has_block(new_block.previous_hash)
+        if is_orphan and not orphans.add(new_block):
+            return "orphan block already pooled", 200
     
-    # case 2: block causes a fork
+    # case 2: parent unknown - the block may simply have arrived before it;
+    # the sync downloads without holding the chain lock
+    if is_orphan:
+        print(f"🧩 Orphan block {new_block.index} ({new_block.hash[:10]}), "
+              f"{len(orphans)} waiting")
+        if peer is not None and sync_from_peer(peer):
+            connect_orphans()
+            recalculate_balances()
+            return "missing ancestors fetched", 200
+    
+    # case 3: block causes a fork, or its ancestors could not be fetched
     return handle_chain_resolution(new_block)
 
+def connect_orphans():
+    """
+    Connect pooled orphans that extend our tip, repeating for their own
+    children until none are left.
+    
+    Returns:
+        int: The number of orphans connected
+    """
+    connected = 0
+    with chain_lock:
+        while True:
+            tip = blockchain.get_last_block()
+            children = [block for block in orphans.pop_children(tip.hash)
+                        if block.index == tip.index + 1]
+            if not children:
+                return connected
+            # competing siblings can no longer connect once one of them has
+            block = children[0]
+            blockchain.add_block(block)
+            connected += 1
+            print(f"🔗 Connected orphan block {block.index} ({block.hash[:10]})")
+
 def handle_chain_resolution(new_block):
     """
     Resolve blockchain forks by adopting the longest valid chain.
@@ -508,79 +1001,176 @@ def handle_chain_resolution(new_block):
         new_block (Block): The conflicting block
         
     Returns:
-        JSON response with resolution status
+        tuple: (status message, HTTP status code)
     """
     print("⚠️ Fork detected - resolving chain...")
     
-    # get all peer chains to find the longest valid one
-    all_chains = [blockchain.chain]
+    if sync_with_best_peer():
+        connect_orphans()
+        print(f"🔄 Adopted longer chain (length {len(blockchain.chain)})")
+        recalculate_balances()
+        return "chain replaced", 200
     
-    for peer in peers:
-        try:
-            # skip self 
-            if peer[1] == PORT:
-                continue
-                
-            url = f"http://{peer[0]}:{peer[1]}/chain"
-            response = requests.get(url, timeout=3)
-            
-            if response.status_code == 200:
-                data = response.json()
-                peer_chain = [blockchain.create_block_from_dict(b) for b in data["chain"]]
-                if is_valid_chain(data["chain"]):
-                    all_chains.append(peer_chain)
-        except Exception as e:
-            print(f"⚠️ Could not fetch chain from {peer}: {e}")
+    print("✅ Our chain remains the longest")
+    return "chain unchanged", 200
 
-    # find the longest valid chain
-    longest_chain = max(all_chains, key=len)
+@app.route('/inv', methods=['POST'])
+def receive_inventory():
+    """
+    Receive an announcement of block hashes and txids from a peer.
     
-    if len(longest_chain) > len(blockchain.chain):
-        print(f"🔄 Adopting longer chain (length {len(longest_chain)})")
-        blockchain.chain = longest_chain
-        blockchain.current_transactions = []
-        recalculate_balances()
-        return jsonify({"status": "chain replaced"}), 200
+    Expected JSON:
+    {
+        "blocks": [block_hash, ...],
+        "txs": [txid, ...],
+        "sender": {"port": int}
+    }
     
-    print("✅ Our chain remains the longest")
-    return jsonify({"status": "chain unchanged"}), 200
+    Records that the sender has these items and queues a /getdata request
+    for the ones we are missing and not already fetching.
+    """
+    data = request.get_json()
+    peer = (request.remote_addr, data["sender"]["port"])
+    blocks = data.get("blocks", [])
+    txs = data.get("txs", [])
+    for item in blocks + txs:
+        inventory.mark(peer, item)
+    
+    wanted_blocks = [
+        block_hash for block_hash in blocks
+        if not blockchain.has_block(block_hash) and inventory.request(block_hash)
+    ]
+    wanted_txs = [
+        txid for txid in txs
+        if blockchain.mempool.get(txid) is None and inventory.request(txid)
+    ]
+    if wanted_blocks or wanted_txs:
+        fetch_pool.submit(fetch_inventory, peer, wanted_blocks, wanted_txs)
+    return jsonify({"status": "ok", "requested": len(wanted_blocks) + len(wanted_txs)}), 200
+
+@app.route('/getdata', methods=['POST'])
+def get_data():
+    """
+    Return the bodies of requested blocks and transactions that we have.
+    
+    Expected JSON:
+    {
+        "blocks": [block_hash, ...],           # full blocks
+        "compact_blocks": [block_hash, ...],   # header + short txids
+        "txs": [txid, ...]
+    }
+    
+    Returns:
+        JSON: {"blocks": [...], "compact_blocks": [...], "txs": [...]}
+    """
+    data = request.get_json()
+    blocks = [blockchain.get_block(block_hash) for block_hash in data.get("blocks", [])]
+    compact = [blockchain.get_block(block_hash) for block_hash in data.get("compact_blocks", [])]
+    txs = [blockchain.mempool.get(txid) for txid in data.get("txs", [])]
+    return jsonify({
+        "blocks": [block.to_dict() for block in blocks if block is not None],
+        "compact_blocks": [make_compact_block(block) for block in compact if block is not None],
+        "txs": [tx.to_dict() for tx in txs if tx is not None],
+    })
+
+@app.route('/getblocktxn', methods=['POST'])
+def get_block_transactions():
+    """
+    Return selected transactions of a block, for peers rebuilding it from
+    a compact block.
+    
+    Expected JSON:
+    {
+        "hash": block_hash,
+        "indexes": [position, ...]
+    }
+    
+    Returns:
+        JSON: {"hash": block_hash, "transactions": [tx_data, ...]}
+    """
+    data = request.get_json()
+    block = blockchain.get_block(data.get("hash", ""))
+    if block is None:
+        return jsonify({"status": "unknown block"}), 404
+    indexes = data.get("indexes", [])
+    if any(not 0 <= i < len(block.transactions) for i in indexes):
+        return jsonify({"status": "index out of range"}), 400
+    return jsonify({
+        "hash": block.hash,
+        "transactions": [block.transactions[i].to_dict() for i in indexes],
+    })
+
+def fetch_inventory(peer, block_hashes, txids):
+    """
+    Fetch announced items from a peer and process them like pushed ones.
+    Runs on a fetch_pool thread.
+    
+    Args:
+        peer (tuple): (host, port) of the peer that announced the items
+        block_hashes (list): Block hashes to fetch
+        txids (list): Transaction ids to fetch
+    """
+    try:
+        res = broadcaster.post(peer, "/getdata", {"compact_blocks": block_hashes, "txs": txids})
+        data = res.json()
+        txs = [Transaction(**tx_data) for tx_data in data["txs"]]
+        accept_transactions([tx for tx in txs if tx.txid in txids])
+        for compact in data["compact_blocks"]:
+            if compact["header"]["hash"] in block_hashes:
+                block_data = rebuild_compact_block(peer, compact)
+                status, code = accept_block(block_data, peer)
+                print(f"📦 Block {block_data['hash'][:10]} from {peer}: {status}")
+    except Exception as e:
+        # nothing waits on the fetch_pool future, so report failures here
+        print(f"⚠️ Could not fetch announced items from {peer}: {e}")
+    finally:
+        inventory.done(block_hashes + txids)
+
+def rebuild_compact_block(peer, compact):
+    """
+    Rebuild a full block from a compact block using our mempool, asking the
+    peer only for the transactions we do not have. Falls back to fetching
+    the full block if the rebuilt one does not match the header.
+    
+    Args:
+        peer (tuple): (host, port) of the peer that sent the compact block
+        compact (dict): {"header": header_data, "short_ids": [...]}
+        
+    Returns:
+        dict: The full block data, as produced by Block.to_dict()
+    """
+    header = compact["header"]
+    transactions, missing = reconstruct_transactions(compact, blockchain.mempool)
+    if missing:
+        res = broadcaster.post(peer, "/getblocktxn", {"hash": header["hash"], "indexes": missing})
+        for position, tx_data in zip(missing, res.json()["transactions"]):
+            transactions[position] = Transaction(**tx_data)
+    
+    block_data = dict(header)
+    block_data["transactions"] = [tx.to_dict() for tx in transactions if tx is not None]
+    rebuilt = blockchain.create_block_from_dict(block_data)
+    if rebuilt.hash != header["hash"]:
+        # short id collision or a peer that sent the wrong transactions
+        print(f"⚠️ Could not rebuild compact block {header['hash'][:10]}, fetching it in full")
+        res = broadcaster.post(peer, "/getdata", {"blocks": [header["hash"]]})
+        return res.json()["blocks"][0]
+    print(f"🧩 Rebuilt block {header['hash'][:10]} with "
+          f"{len(transactions) - len(missing)}/{len(transactions)} transactions from our mempool")
+    return block_data
 
 def resolve_conflicts():
     """
     Actively check network for longer valid chains.
     
-    Queries all peers for their chains and adopts the longest valid one.
+    Asks all peers for their tips and syncs from the one with the most work.
     
     Returns:
         bool/JSON: True if chain replaced, False otherwise
                    or JSON response if called via route
     """
-    global blockchain
-    
     print("🔁 Resolving chain conflicts...")
-    longest_chain = None
-    max_length = len(blockchain.chain)
-    
-    for peer in peers:
-        try:
-            # skip self
-            if peer[1] == PORT:
-                continue
-                
-            url = f"http://{peer[0]}:{peer[1]}/chain"
-            response = requests.get(url, timeout=3)
-            
-            if response.status_code == 200:
-                data = response.json()
-                if data["length"] > max_length and is_valid_chain(data["chain"]):
-                    max_length = data["length"]
-                    longest_chain = data["chain"]
-        except Exception as e:
-            print(f"⚠️ Could not fetch chain from {peer}: {e}")
-
-    if longest_chain:
-        print(f"🔄 Adopting longer chain (length {max_length})")
-        blockchain.chain = [blockchain.create_block_from_dict(b) for b in longest_chain]
+    if sync_with_best_peer():
+        print(f"🔄 Adopted longer chain (length {len(blockchain.chain)})")
         recalculate_balances()
         
         if request: 
@@ -592,6 +1182,165 @@ def resolve_conflicts():
         return jsonify({"status": "chain unchanged"}), 200
     return False
 
+def fetch_tip(peer):
+    """
+    Ask a peer for its chain tip.
+    
+    Args:
+        peer (tuple): (host, port) of the peer to query
+        
+    Returns:
+        dict: The peer's /tip response
+    """
+    url = f"http://{peer[0]}:{peer[1]}/tip"
+    res = requests.get(url, timeout=PEER_QUERY_DEADLINE)
+    res.raise_for_status()
+    return res.json()
+
+def query_peer_tips():
+    """
+    Query every peer's tip concurrently, waiting at most PEER_QUERY_DEADLINE
+    seconds overall. Peers that are slow or unreachable are left out.
+    
+    Returns:
+        list: (work, height, peer) tuples for peers with more work than us,
+              best candidate first
+    """
+    our_work = chain_work(len(blockchain.chain))
+    futures = {
+        peer_query_pool.submit(fetch_tip, peer): peer
+        for peer in other_peers()
+    }
+    candidates = []
+    try:
+        for future in as_completed(futures, timeout=PEER_QUERY_DEADLINE):
+            peer = futures[future]
+            try:
+                tip = future.result()
+            except Exception as e:
+                print(f"⚠️ Could not fetch tip from {peer}: {e}")
+                continue
+            if tip["work"] > our_work:
+                candidates.append((tip["work"], tip["height"], peer))
+    except FuturesTimeout:
+        print("⚠️ Some peers did not report their tip before the deadline")
+    candidates.sort(reverse=True)
+    return candidates
+
+def sync_with_best_peer():
+    """
+    Sync from the peer reporting the most chain work, falling back to the
+    next best candidate if that sync fails. Only the chosen peer's chain
+    is downloaded and validated.
+    
+    Returns:
+        bool: True if our chain was replaced, False otherwise
+    """
+    for work, height, peer in query_peer_tips():
+        if height < len(blockchain.chain):
+            break
+        if sync_from_peer(peer):
+            return True
+    return False
+
+def sync_from_peer(peer):
+    """
+    Download only the part of a peer's chain that we are missing.
+    
+    Sends our block locator to the peer's /headers endpoint to find the
+    last common block, then fetches block bodies above it from /blocks.
+    The new suffix is validated against our block at the fork point and
+    adopted if the resulting chain is longer than ours.
+    
+    Args:
+        peer (tuple): (host, port) of the peer to sync from
+        
+    Returns:
+        bool: True if our chain was replaced, False otherwise
+    """
+    base_url = f"http://{peer[0]}:{peer[1]}"
+    try:
+        # find the fork point from the peer's headers
+        locator = blockchain.get_locator()
+        while True:
+            res = requests.get(f"{base_url}/headers", params={
+                "locator": ",".join(locator)
+            }, timeout=3)
+            if res.status_code != 200:
+                return False
+            data = res.json()
+            if data["length"] <= len(blockchain.chain):
+                return False
+            
+            fork_height = data["start_height"] - 1
+            for header in data["headers"]:
+                if not blockchain.has_block(header["hash"]):
+                    break
+                fork_height = header["index"]
+            else:
+                if data["headers"]:
+                    # every header was already ours; continue from the last one
+                    locator = [data["headers"][-1]["hash"]]
+                    continue
+            break
+        
+        if fork_height < 0:
+            print(f"⚠️ {peer} does not share our genesis block")
+            return False
+        
+        # fetch the missing suffix
+        suffix = []
+        start_height = fork_height + 1
+        while start_height < data["length"]:
+            res = requests.get(f"{base_url}/blocks", params={
+                "start": start_height,
+                "end": data["length"]
+            }, headers={"Accept": BINARY_ACCEPT}, timeout=3)
+            if res.status_code != 200:
+                return False
+            if res.headers.get("Content-Type", "").startswith(WIRE_MIME):
+                blocks = decode_blocks(res.content)
+            else:
+                # older peers only speak JSON
+                blocks = res.json()["blocks"]
+            if not blocks:
+                break
+            suffix.extend(blocks)
+            start_height += len(blocks)
+    except Exception as e:
+        print(f"⚠️ Could not sync from {peer}: {e}")
+        return False
+    
+    with chain_lock:
+        if fork_height >= len(blockchain.chain):
+            return False
+        anchor = blockchain.chain[fork_height]
+    
+    # validate without holding the chain lock, so a long suffix does not
+    # stall mining and block acceptance
+    if not is_valid_chain([anchor.to_dict()] + suffix):
+        print(f"⚠️ Invalid chain suffix from {peer}")
+        return False
+    # hashes were just verified, so build the blocks without recomputing them
+    new_blocks = [blockchain.create_block_from_dict(b, trusted=True) for b in suffix]
+    
+    # our chain may have moved while we were downloading and validating
+    with chain_lock:
+        if fork_height >= len(blockchain.chain) or blockchain.chain[fork_height].hash != anchor.hash:
+            return False
+        if fork_height + 1 + len(suffix) <= len(blockchain.chain):
+            return False
+        if fork_height < blockchain.pruned_height:
+            print(f"⚠️ {peer}'s chain forks below our snapshot; cannot switch to it")
+            return False
+        readmitted = blockchain.reorganize(fork_height, new_blocks)
+        # pooled orphans the sync just connected no longer need a parent
+        for block in new_blocks:
+            orphans.discard(block.hash)
+    print(f"🔄 Synced {len(new_blocks)} blocks from {peer} (fork at height {fork_height}, "
+          f"{len(readmitted)} orphaned transactions returned to the mempool)")
+    return True
+
 @app.route('/peers')
 def show_peers():
     """Return JSON list of known peers."""
@@ -607,85 +1356,330 @@ def get_chain():
             "length": chain_length,
             "chain": [block1_data, block2_data, ...]
         }
+        or the binary-encoded chain if the client accepts WIRE_MIME
     """
-    chain = []
-    for block in blockchain.chain:
-        block_data = {
-            "index": block.index,
-            "previous_hash": block.previous_hash,
-            "timestamp": block.timestamp,
-            "transactions": [tx.__dict__ for tx in block.transactions],
-            "proof_of_work": block.proof_of_work,
-            "hash": block.hash,
-        }
-        chain.append(block_data)
+    if wants_binary():
+        return Response(encode_blocks(blockchain.chain), mimetype=WIRE_MIME)
+    chain = [block.to_dict() for block in blockchain.chain]
     return jsonify({
         "length": len(blockchain.chain),
         "chain": chain,
     })
 
+def wants_binary():
+    """Check whether the client asked for the binary wire encoding."""
+    return request.accept_mimetypes.best_match(["application/json", WIRE_MIME]) == WIRE_MIME
+
+@app.route('/tip', methods=['GET'])
+def get_tip():
+    """
+    Return a summary of our chain tip so peers can pick a sync source
+    without downloading anything else.
+    
+    Returns:
+        JSON: {"height": int, "hash": str, "work": int}
+    """
+    last_block = blockchain.get_last_block()
+    return jsonify({
+        "height": len(blockchain.chain) - 1,
+        "hash": last_block.hash,
+        "work": chain_work(len(blockchain.chain)),
+        "pruned_height": blockchain.pruned_height,
+    })
+
+def chain_work(length):
+    """
+    Estimate the total proof-of-work behind a chain of the given length.
+    
+    Every block is mined at the same difficulty, so each one represents
+    about 16^difficulty hash attempts.
+    
+    Args:
+        length (int): Number of blocks in the chain
+        
+    Returns:
+        int: Expected number of hashes needed to produce the chain
+    """
+    return length * 16 ** blockchain.difficulty
+
+@app.route('/headers', methods=['GET'])
+def get_headers():
+    """
+    Return block headers following the most recent block we share with the caller.
+    
+    Query parameters:
+    - locator: comma-separated block hashes from the caller's tip back to genesis
+    - height: alternatively, the height to start from
+    
+    Returns:
+        JSON: {
+            "length": chain_length,
+            "start_height": height_of_first_header,
+            "headers": [header1_data, ...]   # at most MAX_HEADERS
+        }
+    """
+    start_height = 0
+    locator = request.args.get("locator")
+    if locator:
+        for block_hash in locator.split(","):
+            height = blockchain.block_index.get(block_hash)
+            if height is not None:
+                start_height = height + 1
+                break
+    else:
+        start_height = max(request.args.get("height", 0, type=int), 0)
+    
+    headers = [
+        block.header()
+        for block in blockchain.chain[start_height:start_height + MAX_HEADERS]
+    ]
+    return jsonify({
+        "length": len(blockchain.chain),
+        "start_height": start_height,
+        "headers": headers,
+    })
+
+@app.route('/blocks', methods=['GET'])
+def get_blocks():
+    """
+    Return full blocks for a height range.
+    
+    Query parameters:
+    - start: first height to return (inclusive)
+    - end: last height to return (exclusive), defaults to the chain length
+    
+    Returns:
+        JSON: {
+            "length": chain_length,
+            "blocks": [block_data, ...]   # at most MAX_BLOCKS
+        }
+        or the binary-encoded blocks if the client accepts WIRE_MIME
+    """
+    start_height = max(request.args.get("start", 0, type=int), 0)
+    end_height = request.args.get("end", len(blockchain.chain), type=int)
+    if 0 < start_height <= blockchain.pruned_height:
+        # we bootstrapped from a snapshot and only have headers this far back
+        return jsonify({"status": "blocks pruned"}), 404
+    end_height = min(end_height, start_height + MAX_BLOCKS)
+    if wants_binary():
+        return Response(encode_blocks(blockchain.chain[start_height:end_height]), mimetype=WIRE_MIME)
+    blocks = [block.to_dict() for block in blockchain.chain[start_height:end_height]]
+    return jsonify({
+        "length": len(blockchain.chain),
+        "blocks": blocks,
+    })
+
+@app.route('/snapshot', methods=['GET'])
+def get_snapshot():
+    """
+    Return our latest account-state snapshot so new peers can bootstrap
+    without downloading the full history.
+    
+    Returns:
+        JSON: {"height": int, "hash": str, "balances": {name: balance}}
+    """
+    snapshot = blockchain.snapshots.latest()
+    if snapshot is None:
+        return jsonify({"status": "no snapshot"}), 404
+    return jsonify(snapshot)
+
+def bootstrap_from_snapshot():
+    """
+    Start a fresh peer from a snapshot that several peers agree on.
+    
+    Snapshot balances are not committed to by any block header, so a
+    single peer could hand us whatever balances it likes, and we could
+    never reorganize below the snapshot afterwards. We therefore only
+    adopt a snapshot that SNAPSHOT_CONFIRMATIONS peers serve identically:
+    bootstrapping trusts that at least one of those peers is honest.
+    Without enough agreement the peer falls back to downloading the full
+    chain.
+    
+    The chosen snapshot's block headers are downloaded and checked to
+    form a valid chain ending at the snapshot's block before the balances
+    are loaded. Blocks above the snapshot are fetched by the normal sync
+    afterwards.
+    
+    Returns:
+        bool: True if we bootstrapped from a snapshot, False otherwise
+    """
+    vouched = {}  # { canonical snapshot JSON: [peer, ...] }
+    for work, height, peer in query_peer_tips():
+        try:
+            res = requests.get(f"http://{peer[0]}:{peer[1]}/snapshot", timeout=3)
+            if res.status_code != 200:
+                continue
+            snapshot = res.json()
+            vouched.setdefault(json.dumps(snapshot, sort_keys=True), []).append(peer)
+        except Exception as e:
+            print(f"⚠️ Could not fetch snapshot from {peer}: {e}")
+    
+    agreed = [(json.loads(key), sources) for key, sources in vouched.items()
+              if len(sources) >= SNAPSHOT_CONFIRMATIONS]
+    if not agreed:
+        if vouched:
+            print(f"⚠️ No snapshot is served by {SNAPSHOT_CONFIRMATIONS} peers; syncing the full chain")
+        return False
+    snapshot, sources = max(agreed, key=lambda item: item[0]["height"])
+    
+    for peer in sources:
+        base_url = f"http://{peer[0]}:{peer[1]}"
+        try:
+            headers = []
+            while len(headers) <= snapshot["height"]:
+                res = requests.get(f"{base_url}/headers", params={
+                    "height": len(headers)
+                }, timeout=3)
+                batch = res.json()["headers"]
+                if not batch:
+                    break
+                headers.extend(batch)
+            headers = headers[:snapshot["height"] + 1]
+        except Exception as e:
+            print(f"⚠️ Could not fetch headers from {peer}: {e}")
+            continue
+        
+        if (len(headers) != snapshot["height"] + 1
+                or headers[-1]["hash"] != snapshot["hash"]
+                or not is_valid_header_chain(headers)):
+            print(f"⚠️ Snapshot from {peer} does not match its headers")
+            continue
+        
+        with chain_lock:
+            blockchain.load_snapshot(headers, snapshot)
+        print(f"📦 Bootstrapped from a snapshot at height {snapshot['height']} "
+              f"served by {len(sources)} peers")
+        return True
+    return False
+
+@app.route('/merkle_proof', methods=['GET'])
+def get_merkle_proof():
+    """
+    Return a Merkle inclusion proof for a transaction in one of our blocks,
+    so a client can check inclusion against the block header alone.
+    
+    Query parameters:
+    - block: hash of the block containing the transaction
+    - txid: id of the transaction
+    
+    Returns:
+        JSON: {
+            "block_hash": str,
+            "merkle_root": str,
+            "txid": str,
+            "proof": [[sibling_hash, "left" | "right"], ...]
+        }
+    """
+    block = blockchain.get_block(request.args.get("block", ""))
+    if block is None:
+        return jsonify({"status": "unknown block"}), 404
+    txid = request.args.get("txid", "")
+    proof = block.get_merkle_proof(txid)
+    if proof is None:
+        return jsonify({"status": "transaction not in block"}), 404
+    return jsonify({
+        "block_hash": block.hash,
+        "merkle_root": block.merkle_root,
+        "txid": txid,
+        "proof": proof,
+    })
+
 def register_with_tracker():
     """Register this peer with the central tracker."""
     try:
         url = f"http://{TRACKER_HOST}:{TRACKER_PORT}/register"
-        payload = {"name": PEER_NAME, "port": PORT}
+        payload = {"name": PEER_NAME, "port": PORT, "group": GROUP_CODE}
         res = requests.post(url, json=payload)
-        print(f"✅ Registered with tracker: {res.json()}")
+        data = res.json()
+        print(f"✅ Registered with tracker: {data}")
         # initialize balance for this peer
-        balances[PEER_NAME] = INIT_BALANCE
+        blockchain.state.register(PEER_NAME)
+        if data["version"] > peers_version:
+            set_membership(data["version"], [
+                {"host": host, "port": port, "name": name}
+                for (host, port), name in zip(data["peers"], data["peer_names"])
+            ])
     except Exception as e:
         print(f"❌ Could not register: {e}")
 
+def send_heartbeats():
+    """
+    Renew our tracker lease every HEARTBEAT_INTERVAL seconds, registering
+    again if the tracker no longer knows us. Runs forever on its own thread.
+    """
+    url = f"http://{TRACKER_HOST}:{TRACKER_PORT}/heartbeat"
+    while True:
+        time.sleep(HEARTBEAT_INTERVAL)
+        try:
+            res = requests.post(url, json={"port": PORT, "group": GROUP_CODE}, timeout=3)
+            if res.status_code == 404:
+                print("⚠️ Tracker lease lost, registering again")
+                register_with_tracker()
+        except Exception as e:
+            print(f"⚠️ Could not send heartbeat: {e}")
+
 def broadcast_transaction(transaction):
     """
-    Broadcast a transaction to all peers.
+    Queue a transaction for the next batch sent to all peers.
     
     Args:
         transaction (Transaction): Transaction to broadcast
     """
-    for peer in peers:
-        try:
-            # skip self
-            if peer[1] == PORT:
-                continue
-                
-            url = f"http://{peer[0]}:{peer[1]}/receive_transaction"
-            requests.post(url, json={
-                "data": transaction.__dict__,
-                "from_peer": True
-            }, timeout=3)
-        except Exception as e:
-            print(f"❌ Could not send tx to {peer}: {e}")
+    tx_batcher.add(transaction)
+
+def send_transaction_batch(batch):
+    """
+    Push a coalesced batch of transactions to every peer in one request each,
+    leaving out transactions the peer is already known to have.
+    
+    Args:
+        batch (list): Transactions collected by the batcher
+    """
+    for peer in other_peers():
+        new_txs = [tx for tx in batch if not inventory.knows(peer, tx.txid)]
+        if not new_txs:
+            continue
+        for tx in new_txs:
+            inventory.mark(peer, tx.txid)
+        broadcaster.submit(broadcaster.post, peer, "/receive_transactions", {
+            "transactions": [tx.to_dict() for tx in new_txs],
+            "sender": {"port": PORT}
+        })
+
+tx_batcher = TransactionBatcher(send_transaction_batch, window=TX_BATCH_WINDOW, max_batch=TX_BATCH_SIZE)
 
 def broadcast_block(block):
     """
-    Broadcast a new block to all peers.
+    Announce a new block to all peers.
     
     Args:
         block (Block): Block to broadcast
     """
-    block_data = {
-        "index": block.index,
-        "previous_hash": block.previous_hash,
-        "timestamp": block.timestamp,
-        "transactions": [tx.__dict__ for tx in block.transactions],
-        "proof_of_work": block.proof_of_work,
-        "hash": block.hash,
-    }
+    announce_inventory([block.hash])
+
+def announce_inventory(blocks):
+    """
+    Announce block hashes to every peer not already known to have them.
+    Peers fetch the bodies they are missing through /getdata.
+    Transactions are pushed in batches by the TransactionBatcher instead.
     
-    for peer in peers:
-        try:
-            if peer[1] == PORT:
-                continue
-                
-            url = f"http://{peer[0]}:{peer[1]}/receive_block"
-            requests.post(url, json={
-                "data": block_data,
-                "sender": {"ip": HOST, "port": PORT},
-                "force": True  # ensure peers accept valid blocks
-            }, timeout=3)
-        except Exception as e:
-            print(f"❌ Could not send block to {peer}: {e}")
+    Args:
+        blocks (iterable): Block hashes to announce
+    """
+    for peer in other_peers():
+        new_blocks = [item for item in blocks if not inventory.knows(peer, item)]
+        if not new_blocks:
+            continue
+        for item in new_blocks:
+            inventory.mark(peer, item)
+        broadcaster.submit(broadcaster.post, peer, "/inv", {
+            "blocks": new_blocks,
+            "sender": {"port": PORT}
+        })
+
+def other_peers():
+    """Return the known peers, excluding ourselves."""
+    return [peer for peer in peers if peer[1] != PORT]
 
 """ 
 def start():
@@ -706,58 +1700,46 @@ def start():
     5. Initialize balances
     """
     # initialize own balance
-    balances[PEER_NAME] = INIT_BALANCE
+    blockchain.state.register(PEER_NAME)
+    
+    # fork the validation workers now, before the threads below exist
+    if validation_pool is not None:
+        list(validation_pool.map(abs, range(VALIDATION_WORKERS)))
     
     # start Flask in a separate thread
-    threading.Thread(target=lambda: app.run(host=HOST, port=PORT, debug=False)).start()
+    server = threading.Thread(target=lambda: app.run(host=HOST, port=PORT, debug=False))
+    server.start()
     time.sleep(2)
     
-    # register with tracker
+    # register with tracker, then follow membership changes in the background
     register_with_tracker()
+    threading.Thread(target=watch_membership, daemon=True).start()
+    threading.Thread(target=send_heartbeats, daemon=True).start()
     time.sleep(1)
     
-    # sync with network and get latest blockchain
+    # sync with network and get latest blockchain; a fresh peer starts
+    # from a snapshot and only downloads the blocks above it
     with app.app_context():
+        if len(blockchain.chain) == 1:
+            bootstrap_from_snapshot()
         resolve_conflicts()
     
     # calculate balances based on blockchain state
     recalculate_balances()
     
+    # keep the main thread alive: once it exits, the interpreter starts
+    # shutting down and thread pools refuse new work
+    server.join()
+    
 def initialize_peer_balances():
-    """Initialize balances for all known peers from tracker data."""
-    try:
-        # get peer info from tracker
-        url = f"http://{TRACKER_HOST}:{TRACKER_PORT}/peer_info"
-        res = requests.get(url)
-        if res.status_code == 200:
-            for peer_str, info in res.json().items():
-                peer_name = info['name']
-                if peer_name not in balances:
-                    balances[peer_name] = info['initial_balance']
-    except Exception as e:
-        print(f"⚠️ Could not initialize peer balances: {e}")
+    """Initialize balances for all known peers from the membership cache."""
+    for name in list(peer_names.values()):
+        blockchain.state.register(name)
 
 def try_resolve_chain():
     """Attempt to sync with the longest valid chain from peers."""
-    global blockchain
     print("🔍 Trying to sync blockchain from peers...")
-    longest_chain = blockchain.chain
-    for peer in peers:
-        try:
-            url = f"http://{peer[0]}:{peer[1]}/chain"
-            res = requests.get(url, timeout=3)
-            if res.status_code != 200:
-                continue
-            data = res.json()
-            chain_data = data["chain"]
-            if data["length"] > len(longest_chain) and is_valid_chain(chain_data):
-                longest_chain = [blockchain.create_block_from_dict(b) for b in chain_data]
-                print(f"🔄 Found a longer chain from {peer}")
-        except Exception as e:
-            print(f"⚠️ Could not contact peer {peer}: {e}")
-
-    if len(longest_chain) > len(blockchain.chain):
-        blockchain.chain = longest_chain
+    if sync_with_best_peer():
         print("✅ Synced with longer valid chain.")
     else:
         print("✅ Current chain is already the longest.")
@@ -0,0 +1,102 @@
+import bisect
+import json
+import os
+
+
+class SnapshotStore:
+    """
+    Periodic snapshots of the account state, written every `interval` blocks.
+
+    Each snapshot records the balances after applying the block at its
+    height together with that block's hash, so the state can be restored
+    without replaying the history below it.
+    """
+    def __init__(self, directory, interval=100):
+        """
+        Open (or create) a snapshot directory.
+
+        Parameters:
+            directory : str
+                The directory holding the snapshot files.
+            interval : int, optional
+                Take a snapshot every this many blocks (default is 100).
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.interval = interval
+        self.heights = sorted(
+            int(name[len("snapshot-"):-len(".json")])
+            for name in os.listdir(directory)
+            if name.startswith("snapshot-") and name.endswith(".json")
+        )
+
+    def _path(self, height):
+        return os.path.join(self.directory, f"snapshot-{height:010d}.json")
+
+    def is_due(self, height):
+        """
+        Check whether a snapshot should be taken after the block at a height.
+
+        Parameters:
+            height : int
+                The height of the block just applied.
+
+        Returns:
+            bool
+                True if the height falls on the snapshot interval.
+        """
+        return height > 0 and height % self.interval == 0
+
+    def save(self, height, block_hash, balances):
+        """
+        Write a snapshot atomically.
+
+        Parameters:
+            height : int
+                The height of the block the balances include.
+            block_hash : str
+                The hash of that block.
+            balances : dict
+                The account balances after applying that block.
+        """
+        snapshot = {"height": height, "hash": block_hash, "balances": balances}
+        path = self._path(height)
+        with open(path + ".tmp", "w") as f:
+            json.dump(snapshot, f)
+        os.replace(path + ".tmp", path)
+        if height not in self.heights:
+            bisect.insort(self.heights, height)
+
+    def latest(self, max_height=None):
+        """
+        Load the most recent snapshot, optionally at or below a height.
+
+        Parameters:
+            max_height : int, optional
+                Ignore snapshots above this height.
+
+        Returns:
+            dict or None
+                The snapshot ({"height", "hash", "balances"}), or None if there is none.
+        """
+        if max_height is None:
+            position = len(self.heights)
+        else:
+            position = bisect.bisect_right(self.heights, max_height)
+        if not position:
+            return None
+        with open(self._path(self.heights[position - 1])) as f:
+            return json.load(f)
+
+    def discard_above(self, height):
+        """
+        Delete snapshots above a height, e.g. ones taken on a branch that was abandoned.
+
+        Parameters:
+            height : int
+                The highest height whose snapshot is kept.
+        """
+        position = bisect.bisect_right(self.heights, height)
+        for stale in self.heights[position:]:
+            os.remove(self._path(stale))
+        del self.heights[position:]
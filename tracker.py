@@ -1,52 +1,227 @@
 from flask import Flask, request, jsonify
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+import heapq
+import json
+import os
+import threading
+import time
 import requests
 
 app = Flask(__name__)
-peers = []  # (host, port)
-peer_info = {}  # { (host,port): {name: str, initial_balance: int} }
+
+# peers register into a friend group by group code; peers that give no
+# code share the default group
+DEFAULT_GROUP = "default"
+
+# every membership change gets the next version number within its group;
+# peers apply the changes in order and pull whatever they missed from
+# /peers_since
+MEMBERSHIP_LOG_SIZE = 1000
+
+# changes are pushed to peers in parallel, off the request thread
+PUSH_WORKERS = 16
+PUSH_TIMEOUT = 2
+push_pool = ThreadPoolExecutor(max_workers=PUSH_WORKERS)
+
+# longest a /peers_since request is held open waiting for a change
+MAX_WAIT = 30
+
+# peers must heartbeat within LEASE_TTL seconds or they are evicted
+LEASE_TTL = 30
+REAPER_INTERVAL = 1
+
+# membership is saved here, at most once per SAVE_INTERVAL seconds,
+# so a restarted tracker keeps its groups
+STATE_FILE = "tracker_state.json"
+SAVE_INTERVAL = 1
+
+
+class Group:
+    """
+    Membership of one friend group.
+
+    Each group has its own peer index, versioned change log and condition
+    variable, so registrations, pushes and long-polls in one group never
+    touch the others.
+    """
+    def __init__(self, code):
+        """
+        Create an empty group.
+
+        Args:
+            code (str): The group code peers register with
+        """
+        self.code = code
+        self.peer_info = {}  # { (host,port): {name: str, initial_balance: int} }, in join order
+        self.version = 0
+        self.log = deque(maxlen=MEMBERSHIP_LOG_SIZE)  # recent changes, oldest first
+        self.changed = threading.Condition()
+
+    def member(self, peer):
+        """
+        Describe a registered peer for membership messages.
+
+        Args:
+            peer (tuple): (host, port) of the peer
+
+        Returns:
+            dict: {"host": str, "port": int, "name": str}
+        """
+        return {'host': peer[0], 'port': peer[1], 'name': self.peer_info[peer]['name']}
+
+    def record_change(self, added=(), removed=()):
+        """
+        Log a membership change under the next version and wake long-polls.
+        The caller must hold self.changed.
+
+        Args:
+            added (iterable): (host, port) of peers that joined
+            removed (iterable): (host, port) of peers that left
+
+        Returns:
+            dict: The delta {"version": int, "added": [member, ...],
+                  "removed": [{"host": str, "port": int}, ...]}
+        """
+        self.version += 1
+        delta = {
+            'version': self.version,
+            'added': [self.member(p) for p in added],
+            'removed': [{'host': host, 'port': port} for host, port in removed]
+        }
+        self.log.append(delta)
+        self.changed.notify_all()
+        state_dirty.set()
+        return delta
+
+    def changes_since(self, since):
+        """
+        Collect the changes a peer at a given version is missing.
+        The caller must hold self.changed.
+
+        Args:
+            since (int): The last version the peer applied
+
+        Returns:
+            dict: The missed deltas, or the full membership if the log no
+                  longer reaches back that far
+        """
+        oldest = self.log[0]['version'] if self.log else self.version + 1
+        if since < oldest - 1 or since > self.version:
+            return {
+                'version': self.version,
+                'full': True,
+                'peers': [self.member(p) for p in self.peer_info]
+            }
+        return {
+            'version': self.version,
+            'changes': [delta for delta in self.log if delta['version'] > since]
+        }
+
+
+groups = {}  # { group code: Group }
+groups_lock = threading.Lock()
+
+def get_group(code, create=False):
+    """
+    Look up a group by code.
+
+    Args:
+        code (str): The group code
+        create (bool): Create the group if it does not exist yet
+
+    Returns:
+        Group: The group, or None if it does not exist and create is False
+    """
+    with groups_lock:
+        group = groups.get(code)
+        if group is None and create:
+            group = groups[code] = Group(code)
+        return group
 
 @app.route('/register', methods=['POST'])
 def register():
     """
-    Register a new peer node with the network.
-    
-    Receives peer information via POST request and adds it to the network registry.
-    Automatically updates all existing peers about the new network state.
-    
+    Register a new peer node with its friend group.
+
+    Receives peer information via POST request and adds it to the group's registry.
+    Existing members of the group are sent the change as a membership delta.
+
     Request JSON format:
     {
         "port": int,    # The port the peer is listening on
-        "name": str     # Human-readable name for the peer
+        "name": str,    # Human-readable name for the peer
+        "group": str    # Group code to join (optional, default group if omitted)
     }
-    
+
     Returns:
-        JSON response containing registration status, peer list, and initial balance
+        JSON response containing registration status, the group's peer list
+        and peer names, the membership version they correspond to and
+        initial balance
     """
     peer_data = request.json
     peer_host = request.remote_addr
     peer_port = peer_data['port']
     peer_name = peer_data['name']
-    
+    group = get_group(peer_data.get('group') or DEFAULT_GROUP, create=True)
+
     peer_tuple = (peer_host, peer_port)
-    if peer_tuple not in peers:
-        peers.append(peer_tuple)
-        peer_info[peer_tuple] = {
-            'name': peer_name,
+    delta = None
+    with group.changed:
+        if peer_tuple not in group.peer_info:
+            group.peer_info[peer_tuple] = {
+                'name': peer_name,
+                'initial_balance': 150
+            }
+            print(f"📥 Registered: {peer_name} at {peer_host}:{peer_port} in group {group.code}")
+            delta = group.record_change(added=[peer_tuple])
+        renew_lease(group.code, peer_tuple)
+        response = {
+            'status': 'registered',
+            'group': group.code,
+            'peers': list(group.peer_info),
+            'peer_names': [info['name'] for info in group.peer_info.values()],
+            'version': group.version,
             'initial_balance': 150
         }
-        print(f"📥 Registered: {peer_name} at {peer_host}:{peer_port}")
-        update_all_peers()
-    return jsonify({
-        'status': 'registered',
-        'peers': peers,
-        'initial_balance': 150
-    })
+    if delta:
+        push_delta(group, delta)
+    return jsonify(response)
+
+@app.route('/heartbeat', methods=['POST'])
+def heartbeat():
+    """
+    Renew a registered peer's lease.
+
+    Request JSON format:
+    {
+        "port": int,    # The port the peer is listening on
+        "group": str    # The peer's group code (optional)
+    }
+
+    Returns:
+        200 if the lease was renewed, 404 if the peer is not registered
+        (e.g. it was evicted) and should register again
+    """
+    data = request.json
+    peer_tuple = (request.remote_addr, data['port'])
+    group = get_group(data.get('group') or DEFAULT_GROUP)
+    if group is None:
+        return jsonify({'status': 'unknown peer'}), 404
+    with group.changed:
+        if peer_tuple not in group.peer_info:
+            return jsonify({'status': 'unknown peer'}), 404
+    renew_lease(group.code, peer_tuple)
+    return jsonify({'status': 'ok'})
 
 @app.route('/peer_info', methods=['GET'])
 def get_peer_info():
     """
-    Retrieve information about all registered peers in the network.
-    
+    Retrieve information about the registered peers in a group.
+
+    Query parameters:
+        group (str): The group code (default group if omitted)
+
     Returns:
         JSON dictionary mapping peer addresses to their information:
         {
@@ -57,28 +232,199 @@ def get_peer_info():
             ...
         }
     """
+    group = get_group(request.args.get('group', DEFAULT_GROUP))
+    if group is None:
+        return jsonify({})
+    with group.changed:
+        return jsonify({
+            f"{host}:{port}": info
+            for (host, port), info in group.peer_info.items()
+        })
+
+@app.route('/peers_since', methods=['GET'])
+def peers_since():
+    """
+    Return a group's membership changes after a given version, optionally
+    waiting for one.
+
+    Query parameters:
+        group (str): The group code (default group if omitted)
+        version (int): The last membership version the caller has applied
+        wait (float): Seconds to hold the request open if nothing changed
+                      yet (default 0, at most MAX_WAIT)
+
+    Returns:
+        304 if nothing changed, 404 if the group does not exist, otherwise JSON:
+        {"version": int, "changes": [delta, ...]} with the missed deltas in
+        order, or {"version": int, "full": true, "peers": [member, ...]} if
+        they are no longer in the log
+    """
+    # only /register creates groups, so polling a made-up code cannot
+    # fill the registry
+    group = get_group(request.args.get('group', DEFAULT_GROUP))
+    if group is None:
+        return jsonify({'status': 'unknown group'}), 404
+    since = request.args.get('version', 0, type=int)
+    wait = min(request.args.get('wait', 0, type=float), MAX_WAIT)
+    with group.changed:
+        # a caller ahead of us saw a tracker that has since restarted
+        group.changed.wait_for(lambda: group.version != since, timeout=wait)
+        if group.version == since:
+            return '', 304
+        return jsonify(group.changes_since(since))
+
+# lease expiry times live in a min-heap; renewing pushes a new entry and
+# leaves the old one behind, which the reaper skips when its time comes
+leases = []  # heap of (expires_at, group code, (host, port))
+lease_expiry = {}  # { (group code, (host, port)): current expires_at }
+leases_lock = threading.Lock()
+
+def renew_lease(code, peer):
+    """
+    Extend a peer's lease to LEASE_TTL seconds from now.
+
+    Args:
+        code (str): The peer's group code
+        peer (tuple): (host, port) of the peer
+    """
+    expires_at = time.monotonic() + LEASE_TTL
+    with leases_lock:
+        lease_expiry[(code, peer)] = expires_at
+        heapq.heappush(leases, (expires_at, code, peer))
+
+def pop_expired_leases():
+    """
+    Remove and return the leases that have expired.
+
+    Returns:
+        list: (group code, (host, port)) of peers whose lease ran out
+    """
+    now = time.monotonic()
+    expired = []
+    with leases_lock:
+        while leases and leases[0][0] <= now:
+            expires_at, code, peer = heapq.heappop(leases)
+            # a renewed lease left this entry behind; skip it
+            if lease_expiry.get((code, peer)) == expires_at:
+                del lease_expiry[(code, peer)]
+                expired.append((code, peer))
+    return expired
+
+def reap_expired_peers():
+    """
+    Evict peers whose lease expired and push their removal to their group.
+    Runs forever on its own thread.
+    """
+    while True:
+        for code, peer in pop_expired_leases():
+            group = get_group(code)
+            if group is None:
+                continue
+            with group.changed:
+                if peer not in group.peer_info:
+                    continue
+                name = group.peer_info[peer]['name']
+                delta = group.record_change(removed=[peer])
+                del group.peer_info[peer]
+            print(f"⌛ Evicted {name} at {peer[0]}:{peer[1]} from group {code}: no heartbeat")
+            push_delta(group, delta)
+        time.sleep(REAPER_INTERVAL)
+
+def push_delta(group, delta):
+    """
+    Send a membership delta to every member of a group in parallel.
+
+    Returns immediately; each push runs on the push pool with a timeout,
+    so a slow or dead peer cannot hold up registration or other pushes.
+
+    Args:
+        group (Group): The group that changed
+        delta (dict): The change produced by Group.record_change
+    """
+    with group.changed:
+        members = list(group.peer_info)
+    for peer in members:
+        push_pool.submit(send_delta, peer, delta)
 
-    return jsonify({
-        f"{host}:{port}": info 
-        for (host, port), info in peer_info.items()
-    })
+def send_delta(peer, delta):
+    """
+    POST a membership delta to one peer, logging failures.
+
+    Args:
+        peer (tuple): (host, port) of the peer
+        delta (dict): The change produced by Group.record_change
+    """
+    try:
+        url = f"http://{peer[0]}:{peer[1]}/update_peers"
+        requests.post(url, json=delta, timeout=PUSH_TIMEOUT)
+    except Exception as e:
+        print(f"⚠️ Failed to update {peer}: {e}")
+
+state_dirty = threading.Event()
+
+def save_state():
+    """
+    Write every group's membership to STATE_FILE atomically. Groups whose
+    members have all left are not saved.
+    """
+    with groups_lock:
+        all_groups = list(groups.values())
+    state = {}
+    for group in all_groups:
+        with group.changed:
+            if not group.peer_info:
+                continue
+            state[group.code] = {
+                'version': group.version,
+                'peers': [
+                    {'host': host, 'port': port, **info}
+                    for (host, port), info in group.peer_info.items()
+                ]
+            }
+    with open(STATE_FILE + ".tmp", "w") as f:
+        json.dump(state, f)
+    os.replace(STATE_FILE + ".tmp", STATE_FILE)
 
-def update_all_peers():
+def save_state_when_changed():
     """
-    Notify all registered peers about the current network state.
-    
-    Sends the complete peer list and names to each peer in the network.
-    Silently handles connection errors to individual peers.
+    Save membership after changes, at most once per SAVE_INTERVAL.
+    Runs forever on its own thread.
     """
-    for peer in peers:
+    while True:
+        state_dirty.wait()
+        state_dirty.clear()
         try:
-            url = f"http://{peer[0]}:{peer[1]}/update_peers"
-            requests.post(url, json={
-                "peers": peers,
-                "peer_names": [peer_info[p]['name'] for p in peers]
-            })
-        except Exception as e:
-            print(f"⚠️ Failed to update {peer}: {e}")
+            save_state()
+        except OSError as e:
+            print(f"⚠️ Could not save tracker state: {e}")
+        time.sleep(SAVE_INTERVAL)
+
+def load_state():
+    """
+    Restore groups saved by a previous run. Every restored peer gets a
+    fresh lease, so peers that are gone are evicted after LEASE_TTL.
+    """
+    if not os.path.exists(STATE_FILE):
+        return
+    with open(STATE_FILE) as f:
+        state = json.load(f)
+    for code, saved in state.items():
+        group = get_group(code, create=True)
+        # versions keep counting from where they were, so peers' known
+        # versions stay meaningful; the change log itself is not kept
+        group.version = saved['version']
+        for entry in saved['peers']:
+            peer = (entry['host'], entry['port'])
+            group.peer_info[peer] = {
+                'name': entry['name'],
+                'initial_balance': entry['initial_balance']
+            }
+            renew_lease(code, peer)
+    print(f"📂 Restored {sum(len(g['peers']) for g in state.values())} peers "
+          f"in {len(state)} groups from {STATE_FILE}")
 
 if __name__ == "__main__":
-    app.run(host='0.0.0.0', port=8000)
\ No newline at end of file
+    load_state()
+    threading.Thread(target=reap_expired_peers, daemon=True).start()
+    threading.Thread(target=save_state_when_changed, daemon=True).start()
+    app.run(host='0.0.0.0', port=8000)
@@ -1,3 +1,5 @@
+import hashlib
+import json
 import time
 
 
@@ -23,6 +25,48 @@ class Transaction:
         self.receiver = receiver
         self.amount = amount
         self.timestamp = timestamp or time.time()
+        self._txid = None
+
+    @property
+    def txid(self):
+        """Canonical transaction id: the SHA-256 hash of the transaction contents.
+        
+        Returns:
+            str: Hex digest identifying this transaction across all peers
+        """
+        if self._txid is None:
+            self._txid = self.compute_txid()
+        return self._txid
+
+    def compute_txid(self):
+        """Hash the transaction's current contents, bypassing the cached txid.
+        
+        Returns:
+            str: Hex digest of the transaction contents
+        """
+        tx_string = json.dumps(self.to_dict(), sort_keys=True)
+        return hashlib.sha256(tx_string.encode()).hexdigest()
+
+    def to_dict(self):
+        """Return the transaction fields as a JSON-serializable dictionary.
+        
+        Returns:
+            dict: The sender, receiver, amount and timestamp of the transaction
+        """
+        return {
+            "sender": self.sender,
+            "receiver": self.receiver,
+            "amount": self.amount,
+            "timestamp": self.timestamp,
+        }
+
+    def __eq__(self, other):
+        """Two transactions are equal when their txids match."""
+        return isinstance(other, Transaction) and self.txid == other.txid
+
+    def __hash__(self):
+        """Hash by txid so transactions can be used in sets and as dict keys."""
+        return hash(self.txid)
 
     def __repr__(self):
         """Return an unambiguous string representation of the transaction.